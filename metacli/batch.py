@@ -0,0 +1,95 @@
+import glob
+import os
+import time
+from .schema import generate_project, load_schema, precompile_templates
+
+SCHEMA_SUFFIXES = (".json", ".yaml", ".yml")
+
+
+def find_schemas(source):
+    """
+    :param source: folder of schema files or glob pattern
+    :return: sorted list of schema json / yaml paths
+    """
+    if os.path.isdir(source):
+        paths = [entry.path for entry in os.scandir(source) if entry.is_file()]
+    else:
+        paths = glob.glob(source, recursive=True)
+    return sorted(path for path in paths if path.endswith(SCHEMA_SUFFIXES))
+
+
+def get_project_name(schema_path):
+    """
+    :param schema_path: schema file path
+    :return: project name, the folder name for files named schema.json / schema.yaml
+    """
+    name = os.path.splitext(os.path.basename(schema_path))[0]
+    if name == "schema":
+        name = os.path.basename(os.path.dirname(os.path.abspath(schema_path)))
+    return name
+
+
+def generate_schema_project(schema_path, output_root, include_template=False, overwrite=False, template_dirs=()):
+    """
+    Validate, render and write the project of one schema file, runs in a worker process
+    :param schema_path: schema json / yaml path
+    :param output_root: folder the project folder is created in
+    :param include_template: add schema.json & schema.yaml templates
+    :param overwrite: replace an existing project folder
+    :param template_dirs: user template folders
+    :return: json serializable dict of the result
+    """
+    start = time.perf_counter()
+    project_name = get_project_name(schema_path)
+    project_path = os.path.join(output_root, project_name)
+    record = {"schema": schema_path, "project": project_path}
+    try:
+        if schema_path.endswith(".json"):
+            schema = load_schema(schema_path, "")
+        else:
+            schema = load_schema("", schema_path)
+        files = generate_project(project_path, project_name, schema, include_template, overwrite=overwrite,
+                                 strict=True, template_dirs=template_dirs)
+    except FileExistsError:
+        record.update(status="error", error="project already exists")
+    except Exception as e:
+        record.update(status="error", error="{}: {}".format(type(e).__name__, str(e).split("\n")[0]))
+    else:
+        record.update(status="ok", files=len(files))
+    record["seconds"] = round(time.perf_counter() - start, 4)
+    return record
+
+
+def generate_projects(schema_paths, output_root, workers=None, include_template=False, overwrite=False,
+                      template_dirs=()):
+    """
+    Generate the projects of many schema files in a process pool
+    :param schema_paths: list of schema json / yaml paths
+    :param output_root: folder the project folders are created in
+    :param workers: number of processes, None for the number of cpus
+    :param include_template: add schema.json & schema.yaml templates
+    :param overwrite: replace existing project folders
+    :param template_dirs: user template folders
+    :return: iterator of result dicts in order of completion
+    """
+    from concurrent.futures import ProcessPoolExecutor, as_completed
+
+    # two schemas of the same project name would write into the same folder
+    names = {}
+    for schema_path in schema_paths:
+        names.setdefault(get_project_name(schema_path), []).append(schema_path)
+    duplicates = {path for paths in names.values() if len(paths) > 1 for path in paths}
+    for schema_path in schema_paths:
+        if schema_path in duplicates:
+            yield {"schema": schema_path, "project": os.path.join(output_root, get_project_name(schema_path)),
+                   "status": "error", "error": "project name used by more than one schema", "seconds": 0.0}
+
+    os.makedirs(output_root, exist_ok=True)
+    # compile templates once into the bytecode cache shared by the workers
+    precompile_templates(template_dirs)
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(generate_schema_project, schema_path, output_root, include_template, overwrite,
+                                   template_dirs)
+                   for schema_path in schema_paths if schema_path not in duplicates]
+        for future in as_completed(futures):
+            yield future.result()
@@ -1,12 +1,15 @@
 import click
-from .shell import Shell
-from .schema import SchemaInfoGenerator
+import os
+from .permission import permissions
 
 
 @click.command("shell")
 def shell():
     """ Shell """
+    from .shell import Shell
+
     root_command = click.get_current_context().__dict__['parent'].__dict__['command']
+    permissions.unrestrict(root_command)
     root_ctx = click.Context(root_command)
     repl = Shell(root_ctx, root_shell=True)
     repl.cmdloop()
@@ -17,7 +20,65 @@ def shell():
 @click.pass_context
 def schema(ctx, display):
     """Generate cmd structure json and get help info"""
+    from .schema import SchemaInfoGenerator
+
     # get parent object
     root = click.get_current_context().__dict__['parent'].__dict__['command']
     schema_generator = SchemaInfoGenerator()
     schema_generator.get_help_info(root, display=display)
+
+
+@click.command("daemon")
+@click.option('--socket', 'socket_path', required=True, help='unix socket path to serve on')
+def daemon(socket_path):
+    """Keep plugins loaded and serve invocations on a unix socket"""
+    from .daemon import DaemonServer
+
+    root = click.get_current_context().__dict__['parent'].__dict__['command']
+    click.echo("serving " + root.name + " on " + socket_path)
+    DaemonServer(root, socket_path).serve_forever()
+
+
+@click.command("completion")
+@click.argument('shell_name', type=click.Choice(["bash", "zsh", "fish"]))
+@click.option('--index', 'index_path', help='completion index path, default in ~/.metacli_cache')
+def completion(shell_name, index_path):
+    """Write completion index and print completion script, e.g. eval "$(cli completion bash)" """
+    from .completion import CompletionIndex, get_index_path, get_script
+
+    root_ctx = click.get_current_context().find_root()
+    prog = os.path.basename(root_ctx.info_name)
+    index_path = os.path.abspath(index_path or get_index_path(prog))
+
+    CompletionIndex.build(root_ctx.command).save(index_path)
+    click.echo(get_script(shell_name, prog, index_path), nl=False)
+
+
+@click.command("last-error")
+def last_error():
+    """Show the last error of this command line with source and locals of every frame"""
+    from .crash import format_crash_record, get_crash_path, load_crash_record
+
+    root = click.get_current_context().find_root().command
+    record = load_crash_record(root.name)
+    if record is None:
+        click.echo("No error recorded in " + get_crash_path(root.name))
+        return
+    click.echo(format_crash_record(record))
+
+
+@click.command("tree")
+@click.argument('path', required=False)
+@click.option('--depth', type=int, help='number of folder levels shown')
+@click.option('--max-entries', type=int, help='number of entries shown per folder')
+@click.option('--ignore', multiple=True, help='glob pattern of names not shown, can be repeated')
+def tree(path, depth, max_entries, ignore):
+    """Show files of a plugin layout, default the folder of the root command"""
+    import inspect
+    from .util import TREE_IGNORE, render_tree
+
+    if path is None:
+        root = click.get_current_context().find_root().command
+        # pass_context wraps the callback in a function of click
+        path = os.path.dirname(os.path.abspath(inspect.getfile(inspect.unwrap(root.callback))))
+    render_tree(path, max_depth=depth, ignore=TREE_IGNORE + ignore, max_entries=max_entries)
@@ -0,0 +1,307 @@
+import importlib.util
+import json
+import marshal
+import os
+import pathlib
+import stat
+from .manifest import manifests
+from .util import TREE_IGNORE
+
+BUNDLE_MANIFEST = "metacli_bundle.json"
+BUNDLE_TREE = "tree"
+
+# folders of a plugin package not packed into a bundle, as in project trees plus build output and tests
+BUNDLE_IGNORE = TREE_IGNORE + ("build", "dist", "tests", "*.egg-info")
+
+BUNDLE_MAIN = '''from metacli.bundle import run_bundle
+import os
+
+run_bundle(os.path.dirname(__file__))
+'''
+
+# bundles opened in this process, keyed by archive path
+_bundles = {}
+
+
+class BundleBuilder:
+
+    def __init__(self, cli_path, click_root, json_file="plugin_commands.json"):
+        """
+        Collect a base plugin and all plugins reachable from its plugin json into one archive
+        :param cli_path: path to cli.py of base plugin
+        :param click_root: root command / group in base plugin cli.py
+        :param json_file: plugin json name in every plugin folder
+        """
+        self.cli_path = os.path.realpath(cli_path)
+        self.click_root = click_root
+        self.json_file = json_file
+        self.sources = set()
+        self.manifests = {}
+
+    def walk(self):
+        """
+        Follow plugin json files from the base plugin breadth first, plugins seen before are skipped
+        :return: dict as {plugin json path: plugin json data with resolved file and package_root}
+        """
+        plugins_to_walk = [self.cli_path]
+        seen_plugins = set()
+
+        while plugins_to_walk:
+            cli_path = plugins_to_walk.pop(0)
+            if cli_path in seen_plugins:
+                continue
+            seen_plugins.add(cli_path)
+
+            base = os.path.dirname(cli_path)
+            self.add_package(base)
+
+            plugin_json = os.path.join(base, self.json_file)
+            if not os.path.exists(plugin_json):
+                continue
+
+            command_data = manifests.load(plugin_json)
+
+            modules = []
+            for module in command_data["modules"]:
+                # same path resolution as PluginLoader, done once at build time
+                package_name, package_path = module["package_name"], module["package_path"]
+                file_path = str((pathlib.Path(base) / (package_path + package_name.replace('.', '/') + '.py')).resolve())
+                package_root = str((pathlib.Path(base) / package_path).resolve())
+
+                modules.append(dict(module, file=file_path, package_root=package_root))
+                self.add_package(package_root)
+                plugins_to_walk.append(file_path)
+
+            self.manifests[plugin_json] = {"modules": modules}
+
+        return self.manifests
+
+    def add_package(self, package_root):
+        """
+        Add all python files of a plugin package, virtual environments and folders in BUNDLE_IGNORE are skipped
+        :param package_root: plugin package folder
+        """
+        import fnmatch
+        import re
+
+        ignored = re.compile("|".join(fnmatch.translate(pattern) for pattern in BUNDLE_IGNORE))
+        for root, dirs, files in os.walk(package_root):
+            dirs[:] = [d for d in dirs if not d.startswith(".") and not ignored.match(d)
+                       and not os.path.exists(os.path.join(root, d, "pyvenv.cfg"))]
+            for name in files:
+                if name.endswith(".py") and name != "setup.py":
+                    self.sources.add(os.path.join(root, name))
+
+    def build(self, output):
+        """
+        Write base plugin, plugins and pre-resolved plugin json files as an executable zip archive
+        :param output: archive path
+        :return: number of python files in archive
+        """
+        import zipfile
+
+        self.walk()
+        common = os.path.commonpath(list(self.sources) + list(self.manifests))
+        if os.path.isfile(common):
+            common = os.path.dirname(common)
+
+        def arcname(path):
+            return BUNDLE_TREE + "/" + pathlib.Path(os.path.relpath(path, common)).as_posix()
+
+        manifests = {}
+        for plugin_json, command_data in self.manifests.items():
+            manifests[arcname(plugin_json)] = {
+                "modules": [dict(module, file=arcname(module["file"]), package_root=arcname(module["package_root"]))
+                            for module in command_data["modules"]]
+            }
+
+        bundle_manifest = {"root": {"file": arcname(self.cli_path),
+                                    "package_name": os.path.splitext(os.path.basename(self.cli_path))[0],
+                                    "click_root": self.click_root},
+                           "manifests": manifests}
+
+        with open(output, "wb") as f:
+            f.write(b"#!/usr/bin/env python3\n")
+            with zipfile.ZipFile(f, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+                archive.writestr("__main__.py", BUNDLE_MAIN)
+                archive.writestr(BUNDLE_MANIFEST, json.dumps(bundle_manifest))
+                for source in sorted(self.sources):
+                    name = arcname(source)
+                    archive.write(source, name)
+                    archive.writestr(name[:-3] + ".pyc", self.compile(source, name))
+
+        os.chmod(output, os.stat(output).st_mode | stat.S_IXUSR | stat.S_IXGRP | stat.S_IXOTH)
+        return len(self.sources)
+
+    def compile(self, source, name):
+        """
+        :param source: python file path
+        :param name: file name recorded in the code object
+        :return: timestamp based pyc content
+        """
+        with open(source, "rb") as f:
+            data = f.read()
+        code = compile(data, name, "exec", dont_inherit=True)
+        source_stat = os.stat(source)
+        return (importlib.util.MAGIC_NUMBER +
+                (0).to_bytes(4, "little") +
+                (int(source_stat.st_mtime) & 0xFFFFFFFF).to_bytes(4, "little") +
+                (len(data) & 0xFFFFFFFF).to_bytes(4, "little") +
+                marshal.dumps(code))
+
+
+class Bundle:
+
+    def __init__(self, archive):
+        """
+        Read access to an archive written by BundleBuilder. Files inside are addressed
+        as <archive path>/<name in archive>, like files in a folder.
+        :param archive: archive path
+        """
+        import zipfile
+
+        self.archive = os.path.realpath(archive)
+        self.zip = zipfile.ZipFile(self.archive)
+        self.manifest = json.loads(self.zip.read(BUNDLE_MANIFEST).decode("utf-8"))
+
+        # folder listing of archive, used by plugin finder
+        self.dirs = {}
+        for name in self.zip.namelist():
+            parent, _, child = name.rpartition("/")
+            self.dirs.setdefault(parent, set()).add(child)
+            while parent:
+                parent, _, child = parent.rpartition("/")
+                self.dirs.setdefault(parent, set()).add(child + "/")
+
+    def path(self, name):
+        return self.archive + "/" + name
+
+    def name(self, path):
+        return pathlib.Path(os.path.relpath(path, self.archive)).as_posix()
+
+    def get_manifest(self, plugin_json):
+        """
+        :param plugin_json: plugin json path inside archive
+        :return: pre-resolved plugin json data, None if the archive does not contain it
+        """
+        command_data = self.manifest["manifests"].get(self.name(plugin_json))
+        if command_data is None:
+            return None
+        return {"modules": [dict(module, file=self.path(module["file"]), package_root=self.path(module["package_root"]))
+                            for module in command_data["modules"]]}
+
+    def list_root(self, root):
+        """
+        :param root: plugin package path inside archive
+        :return: dict as {module name: (file location, package search locations)}
+        """
+        modules = {}
+        directory = self.name(root)
+        for child in self.dirs.get(directory, ()):
+            if child.endswith("/"):
+                package = directory + "/" + child[:-1]
+                if "__init__.py" in self.dirs.get(package, ()):
+                    modules[child[:-1]] = (self.path(package + "/__init__.py"), [self.path(package)])
+            elif child.endswith(".py") and child[:-3].isidentifier():
+                modules.setdefault(child[:-3], (self.path(directory + "/" + child), None))
+        return modules
+
+    def get_code(self, path):
+        """
+        :param path: python file path inside archive
+        :return: code object from precompiled bytecode, or compiled from source for another python version
+        """
+        name = self.name(path)
+        pyc_name = name[:-3] + ".pyc"
+        if pyc_name in self.dirs.get(pyc_name.rpartition("/")[0], ()):
+            data = self.zip.read(pyc_name)
+            if data[:4] == importlib.util.MAGIC_NUMBER:
+                return marshal.loads(data[16:])
+        return compile(self.zip.read(name), path, "exec", dont_inherit=True)
+
+    def get_source(self, path):
+        return self.zip.read(self.name(path)).decode("utf-8")
+
+    def get_spec(self, module_name, path, search_locations=None):
+        loader = BundleModuleLoader(self, path)
+        spec = importlib.util.spec_from_loader(module_name, loader, origin=path,
+                                               is_package=search_locations is not None)
+        spec.has_location = True
+        if search_locations is not None:
+            spec.submodule_search_locations = list(search_locations)
+        return spec
+
+
+class BundleModuleLoader:
+
+    def __init__(self, bundle, path):
+        self.bundle = bundle
+        self.path = path
+
+    def create_module(self, spec):
+        return None
+
+    def exec_module(self, module):
+        exec(self.bundle.get_code(self.path), module.__dict__)
+
+    def get_source(self, fullname):
+        return self.bundle.get_source(self.path)
+
+
+def open_bundle(archive):
+    """
+    :param archive: archive path
+    :return: Bundle, opened once per process
+    """
+    archive = os.path.realpath(archive)
+    if archive not in _bundles:
+        _bundles[archive] = Bundle(archive)
+    return _bundles[archive]
+
+
+def find_bundle(path):
+    """
+    :param path: file or folder path
+    :return: Bundle containing the path, None for a normal file
+    """
+    for archive, bundle in _bundles.items():
+        if path.startswith(archive + "/"):
+            return bundle
+    return None
+
+
+def spec_from_path(module_name, path, search_locations=None):
+    """
+    Get module spec for a file which may be inside a bundle
+    :param module_name: module name
+    :param path: python file path
+    :param search_locations: package search locations, None for a module
+    :return: ModuleSpec
+    """
+    bundle = find_bundle(path)
+    if bundle is not None:
+        return bundle.get_spec(module_name, path, search_locations)
+    if search_locations is None:
+        return importlib.util.spec_from_file_location(module_name, path)
+    return importlib.util.spec_from_file_location(module_name, path,
+                                                  submodule_search_locations=search_locations)
+
+
+def run_bundle(archive):
+    """
+    Run the base plugin of a bundle, used by __main__.py in archive
+    :param archive: archive path
+    """
+    from .finder import add_plugin_root
+    from .plugin import registry
+
+    bundle = open_bundle(archive)
+    root = bundle.manifest["root"]
+    file_path = bundle.path(root["file"])
+    add_plugin_root(os.path.dirname(file_path))
+
+    # base plugin decorated with loadLogging already runs while it is loaded
+    module = registry.load(root["package_name"], file_path)
+    exported = getattr(module, "__metacli_commands__", {})
+    command = exported.get(root["click_root"], getattr(module, root["click_root"], None))
+    command.main()
@@ -0,0 +1,275 @@
+import contextlib
+import json
+import os
+import threading
+import click
+from .permission import permissions
+
+CACHE_DIR = ".metacli_cache"
+CACHE_VERSION = 3
+
+# source file sets of plugin subtrees being loaded in each thread, innermost last
+_local = threading.local()
+
+
+def get_recorders():
+    if not hasattr(_local, "recorders"):
+        _local.recorders = []
+    return _local.recorders
+
+
+def record_source(path):
+    """
+    Add a manifest / cli file to every plugin subtree currently being loaded
+    :param path: absolute file path
+    """
+    for sources in get_recorders():
+        sources.add(path)
+
+
+@contextlib.contextmanager
+def recording(inherited=None):
+    """
+    Collect all source files read while loading one plugin subtree
+    :param inherited: recorders of the thread which started loading, used by worker threads
+    :return: set of absolute file paths
+    """
+    recorders = get_recorders()
+    saved = list(recorders)
+    if inherited is not None:
+        recorders[:] = inherited
+
+    sources = set()
+    recorders.append(sources)
+    try:
+        yield sources
+    finally:
+        recorders[:] = saved
+
+
+def fingerprint(paths):
+    """
+    :param paths: iterable of file paths
+    :return: dict as {path: [mtime_ns, size]}, None for a missing file
+    """
+    result = {}
+    for path in paths:
+        try:
+            stat = os.stat(path)
+            result[path] = [stat.st_mtime_ns, stat.st_size]
+        except OSError:
+            result[path] = None
+    return result
+
+
+def describe_command(command):
+    """
+    Describe a command tree in a json serializable dict without importing lazy plugins,
+    groups are described with all commands, not the view of the current user level
+    :param command: click.Command / click.Group
+    :return: dict of command info
+    """
+    from .plugin import LazyPluginGroup
+
+    if isinstance(command, LazyPluginGroup) and command.info is not None:
+        return dict(command.info, name=command.name)
+
+    command_info = {"name": command.name,
+                    "help": command.help,
+                    "short_help": command.short_help,
+                    "hidden": command.hidden,
+                    "permission": getattr(command, "permission", None),
+                    "add_help_option": command.add_help_option,
+                    "help_option_names": command.context_settings.get("help_option_names"),
+                    "params": [describe_param(param) for param in command.params],
+                    "group": isinstance(command, click.MultiCommand)}
+
+    # placeholder which has never been loaded, its subcommands are unknown
+    if isinstance(command, LazyPluginGroup):
+        command_info["partial"] = True
+        return command_info
+
+    if command_info["group"]:
+        commands = permissions.get_all_commands(command) if isinstance(command, click.Group) else {}
+        command_info["commands"] = [describe_command(cmd) for cmd in commands.values()]
+
+    return command_info
+
+
+def describe_param(param):
+    """
+    :param param: click.Option / click.Argument
+    :return: dict of param info
+    """
+    param_info = {"name": param.name,
+                  "param_type": param.param_type_name,
+                  "opts": list(param.opts),
+                  "secondary_opts": list(param.secondary_opts),
+                  "type": param.type.name,
+                  "choices": list(getattr(param.type, "choices", [])),
+                  "required": param.required,
+                  "nargs": param.nargs,
+                  "multiple": param.multiple,
+                  "metavar": param.metavar,
+                  "default": serializable(param.default)}
+
+    if isinstance(param, click.Option):
+        param_info.update({"help": param.help,
+                           "is_flag": param.is_flag,
+                           "count": param.count,
+                           "hidden": param.hidden,
+                           "show_default": param.show_default})
+
+    return param_info
+
+
+def is_complete(info):
+    """
+    :param info: command tree info from describe_command
+    :return: True if no plugin in the tree was left unloaded
+    """
+    return not info.get("partial") and all(is_complete(cmd) for cmd in info.get("commands", []))
+
+
+def build_command(info, level=None):
+    """
+    Build a click command tree without callbacks from command tree info, enough to render help
+    and complete options without importing the plugins
+    :param info: command tree info from describe_command
+    :param level: only keep commands available for this user level, None for all commands
+    :return: click.Command / click.Group
+    """
+    params = [build_param(param_info) for param_info in info["params"]]
+    kwargs = {"name": info["name"], "params": params, "help": info["help"],
+              "short_help": info["short_help"], "hidden": info["hidden"], "add_help_option": info["add_help_option"]}
+    if info["help_option_names"]:
+        kwargs["context_settings"] = {"help_option_names": info["help_option_names"]}
+    if info["group"]:
+        commands = [build_command(cmd, level) for cmd in info.get("commands", [])
+                    if permissions.is_allowed(cmd.get("permission"), level)]
+        return click.Group(commands={cmd.name: cmd for cmd in commands}, **kwargs)
+    return click.Command(callback=None, **kwargs)
+
+
+def build_param(param_info):
+    """
+    :param param_info: param info from describe_param
+    :return: click.Option / click.Argument
+    """
+    if param_info["choices"]:
+        param_type = click.Choice(param_info["choices"])
+    else:
+        param_type = CachedParamType(param_info["type"])
+
+    if param_info["param_type"] == "argument":
+        return click.Argument([param_info["name"]], type=param_type, required=param_info["required"],
+                              nargs=param_info["nargs"], metavar=param_info["metavar"],
+                              default=param_info["default"])
+
+    decls = [param_info["name"]]
+    secondary_opts = param_info["secondary_opts"]
+    for index, opt in enumerate(param_info["opts"]):
+        decls.append(opt + "/" + secondary_opts[index] if index < len(secondary_opts) else opt)
+
+    kwargs = {"required": param_info["required"], "multiple": param_info["multiple"],
+              "metavar": param_info["metavar"], "default": param_info["default"],
+              "help": param_info["help"], "hidden": param_info["hidden"],
+              "show_default": param_info["show_default"]}
+    if param_info["is_flag"] or param_info["count"]:
+        return click.Option(decls, is_flag=param_info["is_flag"], count=param_info["count"], **kwargs)
+    return click.Option(decls, type=param_type, nargs=param_info["nargs"], **kwargs)
+
+
+class CachedParamType(click.ParamType):
+
+    def __init__(self, name):
+        """
+        Stand-in for the type of a cached param, keeps the name shown as metavar in help
+        :param name: name of the original param type
+        """
+        self.name = name
+
+
+def serializable(value):
+    if value is None or isinstance(value, (str, int, float, bool)):
+        return value
+    if isinstance(value, (list, tuple)):
+        return [serializable(v) for v in value]
+    return str(value)
+
+
+class ManifestCache:
+
+    def __init__(self, manifest_path):
+        """
+        On-disk cache of plugin json and the command tree of every plugin listed in it
+        :param manifest_path: absolute path of plugin json
+        """
+        self.manifest_path = manifest_path
+        base, name = os.path.split(manifest_path)
+        self.cache_path = os.path.join(base, CACHE_DIR, name)
+        self.dirty = False
+        self.data = self.read()
+
+    def read(self):
+        try:
+            with open(self.cache_path) as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            data = None
+
+        if not isinstance(data, dict) or data.get("version") != CACHE_VERSION:
+            data = {"version": CACHE_VERSION, "manifest": None, "modules": {}}
+        return data
+
+    def get_manifest(self):
+        """
+        :return: cached plugin json data if the file has not changed, else None
+        """
+        manifest = self.data["manifest"]
+        if manifest is None or manifest["sources"] != fingerprint([self.manifest_path]):
+            return None
+        return manifest["data"]
+
+    def put_manifest(self, command_data):
+        self.data["manifest"] = {"sources": fingerprint([self.manifest_path]),
+                                 "data": command_data}
+        self.dirty = True
+
+    def get(self, module):
+        """
+        :param module: one entry of "modules" in plugin json
+        :return: cached command tree info if none of its source files changed, else None
+        """
+        entry = self.data["modules"].get(module["name"])
+        if entry is None or entry["module"] != module:
+            return None
+        if entry["sources"] != fingerprint(entry["sources"]):
+            return None
+        return entry["info"]
+
+    def put(self, module, info, sources):
+        """
+        :param module: one entry of "modules" in plugin json
+        :param info: command tree info from describe_command
+        :param sources: source files of the plugin subtree
+        """
+        self.data["modules"][module["name"]] = {"module": module,
+                                                "sources": fingerprint(sorted(sources)),
+                                                "info": info}
+        self.dirty = True
+
+    def save(self):
+        """ Write the cache file, a read-only plugin folder just keeps running without cache """
+        if not self.dirty:
+            return
+        tmp_path = self.cache_path + "." + str(os.getpid())
+        try:
+            os.makedirs(os.path.dirname(self.cache_path), exist_ok=True)
+            with open(tmp_path, "w") as f:
+                json.dump(self.data, f)
+            os.replace(tmp_path, self.cache_path)
+            self.dirty = False
+        except OSError:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
@@ -0,0 +1,188 @@
+import bisect
+import json
+import os
+import shlex
+import sys
+
+COMPLETION_VERSION = 1
+
+BASH_SCRIPT = '''_{func}_completion() {{
+    local IFS=$'\\n'
+    COMPREPLY=( $({python} -m metacli.completion {index} "${{COMP_WORDS[@]:1:$COMP_CWORD}}") )
+}}
+complete -o default -F _{func}_completion {prog}
+'''
+
+ZSH_SCRIPT = '''#compdef {prog}
+_{func}_completion() {{
+    local -a candidates
+    candidates=(${{(f)"$({python} -m metacli.completion {index} "${{(@)words[2,$CURRENT]}}")"}})
+    compadd -a candidates
+}}
+compdef _{func}_completion {prog}
+'''
+
+FISH_SCRIPT = '''complete -c {prog} -f -a '({python} -m metacli.completion {index} (commandline -opc)[2..-1] (commandline -ct))'
+'''
+
+SCRIPTS = {"bash": BASH_SCRIPT, "zsh": ZSH_SCRIPT, "fish": FISH_SCRIPT}
+
+
+def get_index_path(prog):
+    """
+    :param prog: program name of the root command
+    :return: default index path in the user's home folder
+    """
+    return os.path.join(os.path.expanduser("~"), ".metacli_cache", "completion." + prog + ".json")
+
+
+def get_script(shell, prog, index_path):
+    """
+    :param shell: bash / zsh / fish
+    :param prog: program name to complete
+    :param index_path: completion index queried by the script
+    :return: completion script to be evaluated by the shell
+    """
+    func = "".join(c if c.isalnum() else "_" for c in prog)
+    return SCRIPTS[shell].format(func=func, prog=prog, python=shlex.quote(sys.executable),
+                                 index=shlex.quote(index_path))
+
+
+def get_complete_command(command):
+    """
+    :param command: click.Command / click.Group / LazyPluginGroup
+    :return: command with known subcommands, cached tree of a plugin if complete, else the loaded plugin
+    """
+    from .plugin import LazyPluginGroup
+
+    if isinstance(command, LazyPluginGroup):
+        shadow = command.get_shadow()
+        return shadow if shadow is not None else command.resolve()
+    return command
+
+
+def describe_node(command):
+    """
+    :param command: click.Command / click.Group
+    :return: sorted subcommand and option names of one command, choices of options
+    """
+    import click
+
+    options = []
+    choices = {}
+    for param in command.params:
+        if not isinstance(param, click.Option) or param.hidden:
+            continue
+        options.extend(param.opts + param.secondary_opts)
+        if isinstance(param.type, click.Choice):
+            for opt in param.opts:
+                choices[opt] = sorted(param.type.choices)
+
+    if command.add_help_option:
+        options.append("--help")
+
+    commands = getattr(command, "commands", {})
+    return {"commands": sorted(name for name, cmd in commands.items() if not cmd.hidden),
+            "options": sorted(set(options)),
+            "choices": choices}
+
+
+class CompletionIndex:
+
+    def __init__(self, nodes):
+        """
+        Subcommand and option names of every command path, kept sorted so candidates
+        for a prefix are found by binary search
+        :param nodes: dict as {command path joined by spaces: node info from describe_node}
+        """
+        self.nodes = nodes
+
+    @classmethod
+    def build(cls, root):
+        """
+        Walk the plugin tree, plugins in cache are read from the cache instead of being imported
+        :param root: root click.Group
+        :return: CompletionIndex
+        """
+        nodes = {}
+        commands_to_walk = [("", root)]
+        while commands_to_walk:
+            path, command = commands_to_walk.pop()
+            command = get_complete_command(command)
+            nodes[path] = describe_node(command)
+            for name in nodes[path]["commands"]:
+                commands_to_walk.append(((path + " " + name).strip(), command.commands[name]))
+        return cls(nodes)
+
+    @classmethod
+    def load(cls, index_path):
+        """
+        :param index_path: index file written by save
+        :return: CompletionIndex, empty if the file is missing or outdated
+        """
+        try:
+            with open(index_path) as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return cls({})
+        if not isinstance(data, dict) or data.get("version") != COMPLETION_VERSION:
+            return cls({})
+        return cls(data["nodes"])
+
+    def save(self, index_path):
+        os.makedirs(os.path.dirname(os.path.abspath(index_path)), exist_ok=True)
+        tmp_path = index_path + "." + str(os.getpid())
+        with open(tmp_path, "w") as f:
+            json.dump({"version": COMPLETION_VERSION, "nodes": self.nodes}, f)
+        os.replace(tmp_path, index_path)
+
+    def complete(self, words):
+        """
+        :param words: words after the program name, the last one is the word being completed
+        :return: list of candidates
+        """
+        words = list(words) or [""]
+        incomplete = words.pop()
+
+        path = ""
+        node = self.nodes.get(path)
+        if node is None:
+            return []
+        for word in words:
+            child = (path + " " + word).strip()
+            # option values and arguments do not change the command path
+            if word in node["commands"] and child in self.nodes:
+                path, node = child, self.nodes[child]
+
+        if words and words[-1] in node["choices"]:
+            return starting_with(node["choices"][words[-1]], incomplete)
+        if incomplete.startswith("-"):
+            return starting_with(node["options"], incomplete)
+        return starting_with(node["commands"], incomplete)
+
+
+def starting_with(names, prefix):
+    """
+    :param names: sorted list of names
+    :param prefix: typed prefix
+    :return: names starting with prefix
+    """
+    result = []
+    for index in range(bisect.bisect_left(names, prefix), len(names)):
+        if not names[index].startswith(prefix):
+            break
+        result.append(names[index])
+    return result
+
+
+def main():
+    """ python -m metacli.completion <index> [words]..., called by the completion scripts on TAB """
+    if len(sys.argv) < 2:
+        sys.exit("usage: python -m metacli.completion <index> [words]...")
+    candidates = CompletionIndex.load(sys.argv[1]).complete(sys.argv[2:])
+    if candidates:
+        sys.stdout.write("\n".join(candidates) + "\n")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,149 @@
+import json
+import linecache
+import os
+import reprlib
+import sys
+import time
+import traceback
+
+CRASH_ENV = "METACLI_STACKPRINTER"
+MAX_FRAMES = 40
+MAX_LOCALS = 30
+MAX_REPR = 200
+
+
+class CrashRepr(reprlib.Repr):
+
+    def __init__(self):
+        """ Bounded repr of locals, containers are cut after a few items instead of being walked """
+        reprlib.Repr.__init__(self)
+        self.maxlevel = 3
+        self.maxdict = 8
+        self.maxlist = self.maxtuple = self.maxset = self.maxfrozenset = self.maxdeque = self.maxarray = 8
+        self.maxstring = self.maxlong = self.maxother = MAX_REPR
+
+    def repr_instance(self, obj, level):
+        try:
+            text = repr(obj)
+        except Exception:
+            return "<{} instance, repr failed>".format(type(obj).__name__)
+        if len(text) > self.maxother:
+            return text[:self.maxother - 3] + "..."
+        return text
+
+
+crash_repr = CrashRepr()
+
+
+def get_crash_path(command_name):
+    """
+    :param command_name: name of the root command
+    :return: path of the last crash record of the command line
+    """
+    return os.path.join(os.path.expanduser("~"), ".metacli_cache", "last_error." + str(command_name) + ".json")
+
+
+def describe_exception(error):
+    """
+    Compact record of an exception, frames keep file, line, function and truncated locals,
+    source lines are read when the record is rendered
+    :param error: exception with traceback
+    :return: json serializable dict
+    """
+    frames = []
+    for frame, line in traceback.walk_tb(error.__traceback__):
+        local_items = list(frame.f_locals.items())
+        frames.append({"file": frame.f_code.co_filename,
+                       "line": line,
+                       "function": frame.f_code.co_name,
+                       "locals": {name: safe_repr(value) for name, value in local_items[:MAX_LOCALS]},
+                       "hidden_locals": max(len(local_items) - MAX_LOCALS, 0)})
+
+    record = {"time": time.strftime("%Y-%m-%d %H:%M:%S"),
+              "argv": list(sys.argv),
+              "type": type(error).__name__,
+              "message": truncate(str(error)),
+              # innermost frames are the interesting ones
+              "frames": frames[-MAX_FRAMES:],
+              "hidden_frames": max(len(frames) - MAX_FRAMES, 0)}
+
+    cause = error.__cause__ or error.__context__
+    if cause is not None and not error.__suppress_context__:
+        record["cause"] = {"type": type(cause).__name__, "message": truncate(str(cause))}
+    return record
+
+
+def truncate(text, size=MAX_REPR * 5):
+    return text if len(text) <= size else text[:size - 3] + "..."
+
+
+def safe_repr(value):
+    try:
+        return truncate(crash_repr.repr(value), MAX_REPR * 2)
+    except Exception:
+        return "<{} instance, repr failed>".format(type(value).__name__)
+
+
+def save_crash_record(command_name, error):
+    """
+    :param command_name: name of the root command
+    :param error: exception with traceback
+    :return: path of the record, None if it could not be written
+    """
+    crash_path = get_crash_path(command_name)
+    tmp_path = crash_path + "." + str(os.getpid())
+    try:
+        os.makedirs(os.path.dirname(crash_path), exist_ok=True)
+        with open(tmp_path, "w") as f:
+            json.dump(describe_exception(error), f)
+        os.replace(tmp_path, crash_path)
+    except OSError:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        return None
+    return crash_path
+
+
+def load_crash_record(command_name):
+    """
+    :param command_name: name of the root command
+    :return: last crash record, None if there is none
+    """
+    try:
+        with open(get_crash_path(command_name)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def format_crash_record(record, context=2):
+    """
+    Render a crash record in the layout of stackprinter, source is read from the files now
+    :param record: dict from describe_exception
+    :param context: number of source lines shown before the failing line
+    :return: text
+    """
+    lines = ["{} {}".format(record["time"], " ".join(record["argv"]))]
+    if record["hidden_frames"]:
+        lines.append("... {} outer frames not recorded".format(record["hidden_frames"]))
+
+    for frame in record["frames"]:
+        lines.append("")
+        lines.append("File {}, line {}, in {}".format(frame["file"], frame["line"], frame["function"]))
+        for number in range(max(frame["line"] - context, 1), frame["line"] + 1):
+            source = linecache.getline(frame["file"], number).rstrip()
+            if source:
+                marker = "-->" if number == frame["line"] else "   "
+                lines.append("    {} {:>4} {}".format(marker, number, source))
+        if frame["locals"]:
+            lines.append("    " + "." * 50)
+        for name, value in frame["locals"].items():
+            lines.append("     {} = {}".format(name, value))
+        if frame["hidden_locals"]:
+            lines.append("     ... {} more locals".format(frame["hidden_locals"]))
+
+    lines.append("")
+    if "cause" in record:
+        lines.append("caused by {}: {}".format(record["cause"]["type"], record["cause"]["message"]))
+    lines.append("{}: {}".format(record["type"], record["message"]))
+    return "\n".join(lines)
@@ -0,0 +1,167 @@
+import array
+import json
+import logging
+import os
+import signal
+import socket
+import struct
+import sys
+import traceback
+
+# stdin, stdout and stderr of the client are passed to the server
+STANDARD_FDS = (0, 1, 2)
+
+
+def send_request(sock, request):
+    """
+    Send client standard file descriptors and the request to the server
+    :param sock: connected unix socket
+    :param request: dict of argv, env and cwd
+    """
+    fds = array.array("i", STANDARD_FDS)
+    sock.sendmsg([b"R"], [(socket.SOL_SOCKET, socket.SCM_RIGHTS, fds.tobytes())])
+    payload = json.dumps(request).encode("utf-8")
+    sock.sendall(struct.pack("!I", len(payload)) + payload)
+
+
+def receive_request(sock):
+    """
+    :param sock: connected unix socket
+    :return: (list of client file descriptors, request dict)
+    """
+    fds = array.array("i")
+    message, ancdata, flags, address = sock.recvmsg(1, socket.CMSG_LEN(len(STANDARD_FDS) * fds.itemsize))
+    for level, kind, data in ancdata:
+        if level == socket.SOL_SOCKET and kind == socket.SCM_RIGHTS:
+            fds.frombytes(data[:len(data) - (len(data) % fds.itemsize)])
+
+    size, = struct.unpack("!I", receive_exactly(sock, 4))
+    return list(fds), json.loads(receive_exactly(sock, size).decode("utf-8"))
+
+
+def receive_exactly(sock, size):
+    data = b""
+    while len(data) < size:
+        chunk = sock.recv(size - len(data))
+        if not chunk:
+            raise ConnectionError("connection closed by peer")
+        data += chunk
+    return data
+
+
+def exit_code_of(error):
+    """
+    :param error: SystemExit raised by click
+    :return: process exit code
+    """
+    if error.code is None:
+        return 0
+    if isinstance(error.code, int):
+        return error.code
+    sys.stderr.write(str(error.code) + "\n")
+    return 1
+
+
+class DaemonServer:
+
+    def __init__(self, command, socket_path):
+        """
+        Keep a loaded root command warm and run each invocation in a forked child
+        :param command: root click.Group with all plugins loaded
+        :param socket_path: unix socket path to listen on
+        """
+        self.command = command
+        self.socket_path = socket_path
+
+    def serve_forever(self):
+        if os.path.exists(self.socket_path):
+            os.remove(self.socket_path)
+
+        server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        server.bind(self.socket_path)
+        server.listen(64)
+
+        # children report their exit code to the client, nothing to wait for
+        signal.signal(signal.SIGCHLD, signal.SIG_IGN)
+        try:
+            while True:
+                conn, address = server.accept()
+                if os.fork() == 0:
+                    server.close()
+                    self.handle(conn)
+                conn.close()
+        finally:
+            server.close()
+            if os.path.exists(self.socket_path):
+                os.remove(self.socket_path)
+
+    def handle(self, conn):
+        """ Run one invocation in the forked child with the client's stdio, cwd and env, never returns """
+        signal.signal(signal.SIGCHLD, signal.SIG_DFL)
+        code = 1
+        try:
+            fds, request = receive_request(conn)
+            sys.stdout.flush()
+            sys.stderr.flush()
+            for target, fd in zip(STANDARD_FDS, fds):
+                os.dup2(fd, target)
+                os.close(fd)
+
+            os.chdir(request["cwd"])
+            os.environ.clear()
+            os.environ.update(request["env"])
+            sys.argv = request["argv"]
+            code = self.run(request["argv"])
+        except Exception:
+            traceback.print_exc()
+        finally:
+            try:
+                # os._exit skips atexit, write queued log records first
+                logging.shutdown()
+                sys.stdout.flush()
+                sys.stderr.flush()
+                conn.sendall(struct.pack("!i", code))
+            finally:
+                os._exit(code)
+
+    def run(self, argv):
+        """
+        :param argv: client argv, argv[0] is the program name
+        :return: exit code
+        """
+        try:
+            self.command.main(args=argv[1:], prog_name=os.path.basename(argv[0]), standalone_mode=True)
+        except SystemExit as e:
+            return exit_code_of(e)
+        return 0
+
+
+def run_client(socket_path, argv):
+    """
+    Forward an invocation to a warm server, output goes directly to this process's stdout / stderr
+    :param socket_path: unix socket path of the server
+    :param argv: argv of the invocation, argv[0] is the program name
+    :return: exit code
+    """
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.connect(socket_path)
+        send_request(sock, {"argv": list(argv), "env": dict(os.environ), "cwd": os.getcwd()})
+        code, = struct.unpack("!i", receive_exactly(sock, 4))
+        return code
+    finally:
+        sock.close()
+
+
+def main():
+    """ python -m metacli.daemon <socket> <program name> [args]... """
+    if len(sys.argv) < 3:
+        sys.exit("usage: python -m metacli.daemon <socket> <program name> [args]...")
+    try:
+        sys.exit(run_client(sys.argv[1], sys.argv[2:]))
+    except (ConnectionError, FileNotFoundError) as e:
+        sys.exit("Cannot reach metacli daemon at " + sys.argv[1] + ": " + str(e))
+
+
+if __name__ == '__main__':
+    main()
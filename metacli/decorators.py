@@ -1,55 +1,118 @@
 import functools
-from .builtin_plugins import shell, schema
-from .util import check_valid_json, get_logger
+import inspect
+from .builtin_plugins import shell, schema, daemon, completion, last_error, tree
+from .util import get_logger
 from .plugin import PluginLoader
+from .bundle import find_bundle
+from .cache import ManifestCache, record_source
+from .entry_points import EntryPointIndex
+from .manifest import manifests
+from .permission import permissions
+from .profiler import profiler
+from .crash import CRASH_ENV, save_crash_record
 import pathlib
 import os
-import json
 import click
 import sys
-import stackprinter
 
 
-def loadPlugin(func=None, *, json_file=None, base_path=None):
+def loadPlugin(func=None, *, json_file=None, base_path=None, lazy=False, cache=False, workers=None,
+               entry_point_group=None):
     """
     Decorate function to load plugins
     :param func: current click.Command / Group object
     :param json_file: plugin json in next level
     :param base_path: current plugin metacli.py path
+    :param lazy: only import a plugin module when its command is used
+    :param cache: keep command tree in .metacli_cache and only reload plugins whose files changed
+    :param workers: number of threads to import sibling plugins concurrently
+    :param entry_point_group: also add plugins installed as distributions under this entry point group,
+                              they are always loaded lazily
     :return:
     """
     if func is None:
         return functools.partial(loadPlugin,
                                  json_file=json_file,
-                                 base_path=base_path)
+                                 base_path=base_path,
+                                 lazy=lazy,
+                                 cache=cache,
+                                 workers=workers,
+                                 entry_point_group=entry_point_group)
 
     @functools.wraps(func)
     def wrapper():
+        profiler.configure()
         base = pathlib.Path(base_path).resolve().parent
-        plugin_json = str(base / json_file)
+        if json_file is not None:
+            load_plugin_json(func, base, str(base / json_file), lazy=lazy, cache=cache, workers=workers)
 
-        # load plugins based on json
-        if not os.path.exists(plugin_json):
-            raise Exception("invalid path for" + plugin_json)
-        else:
-            with open(plugin_json) as f:
-                check_valid_json(plugin_json)
-                command_data = json.load(f)
-
-            loader = PluginLoader(func, base)
-            loader.load_plugin(command_data)
+        # installed plugins are only imported when their command is used
+        if entry_point_group is not None:
+            loader = PluginLoader(func, base, lazy=True)
+            loader.load_plugin(EntryPointIndex(base, entry_point_group).get_manifest())
 
+        # plugins of the root group are filtered as well, a parent plugin loader filters again with the same views
+        func.commands = permissions.get_view(func, permissions.get_view_level())
         return func
 
     return wrapper()
 
 
+def load_plugin_json(func, base, plugin_json, lazy=False, cache=False, workers=None):
+    """
+    Load plugins listed in plugin json into func, see loadPlugin
+    :param func: current click.Command / Group object
+    :param base: folder of current plugin
+    :param plugin_json: absolute plugin json path
+    """
+    # plugin json of a bundled plugin is read from the bundle, already resolved
+    bundle = find_bundle(plugin_json)
+    if bundle is not None:
+        command_data = bundle.get_manifest(plugin_json)
+        if command_data is None:
+            raise Exception("invalid path for" + plugin_json)
+
+        loader = PluginLoader(func, base, lazy=lazy, workers=workers)
+        loader.load_plugin(command_data)
+
+    # load plugins based on json
+    elif not os.path.exists(plugin_json):
+        raise Exception("invalid path for" + plugin_json)
+    else:
+        record_source(plugin_json)
+        manifest_cache = ManifestCache(plugin_json) if cache else None
+        command_data = manifest_cache.get_manifest() if manifest_cache else None
+
+        if command_data is None:
+            with profiler.section("manifest", plugin_json):
+                command_data = manifests.load(plugin_json)
+            if manifest_cache:
+                manifest_cache.put_manifest(command_data)
+
+        loader = PluginLoader(func, base, lazy=lazy, cache=manifest_cache, workers=workers)
+        loader.load_plugin(command_data)
+
+
+def exportCommand(func):
+    """
+    Decorate click.Command / Group to export it as plugin root, so the plugin loader finds
+    click_root in __metacli_commands__ instead of scanning every attribute of the module
+    :param func: current click.Command / Group object
+    :return:
+    """
+    # callbacks wrapped by click.pass_context etc. keep the plugin function in __wrapped__
+    exported = inspect.unwrap(func.callback).__globals__.setdefault("__metacli_commands__", {})
+    exported[func.name] = func
+    return func
+
+
 def addBuiltin(name=None):
     def decorator(func):
         @functools.wraps(func)
         def wrapper():
             try:
-                root = globals()[name]
+                # builtin names may contain "-", e.g. last-error
+                root = globals()[name.replace("-", "_")]
                 func.add_command(root)
             except KeyError:
                 raise KeyError("Cannot find builtin plugin: " + name)
@@ -70,13 +133,23 @@ def loadLogging(func=None, *, logger_name="metacli"):
 
     @functools.wraps(func)
     def wrapper(*args, **kwargs):
+        # plugins are loaded when the command is about to run, report startup profile if enabled
+        profiler.configure()
+        profiler.finish()
+
         logger = get_logger(logger_name)
         setattr(func, "logger", logger)
         try:
             return func.main(*args, **kwargs)
-        except Exception:
+        except Exception as e:
             logger.exception("Exception occurred in CatchAllExceptions()")
-            logger.error(stackprinter.format())
+
+            # locals of every frame are formatted by stackprinter only on request, see last-error
+            save_crash_record(func.name, e)
+            if os.environ.get(CRASH_ENV):
+                import stackprinter
+
+                logger.error(stackprinter.format())
             file_location = logger.handlers[0].baseFilename
             click.echo("An error occurred during processing. Please check the log file at: " + file_location)
             sys.exit(1)
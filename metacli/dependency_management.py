@@ -1,10 +1,9 @@
 import os
 import pathlib
-import json
 import distutils.core
 import sys
 import re
-import jsonschema
+from .manifest import manifests
 
 
 class DependencyManagement:
@@ -267,8 +266,7 @@ class DependencyManagement:
         setup_list = []
         plugins_list = []
 
-        with open(path_plugins) as f:
-            command_data = json.load(f)
+        command_data = manifests.load(path_plugins)
 
         for module in command_data["modules"]:
             # Get the path to where the package is located
@@ -333,22 +331,4 @@ class DependencyManagement:
         Ensures the plugin_commands.json is valid format
         :param json_path: path to the plugin_commands.json
         '''
-        # the kind of json we expect in plugins_commands.json
-        schema = {
-            "type": "object",
-            "properties": {
-                "name": {"type": "string"},
-                "click_root": {"type": "string"},
-                "package_path": {"type": "string"},
-                "package_name": {"type": "string"}
-            }
-        }
-        with open(json_path) as f:
-            try:
-                command_data = json.load(f)
-                # validate given json is same as what is described in schema
-                jsonschema.validate(command_data, schema)
-            except jsonschema.exceptions.ValidationError as e:
-                print("invalid json", e)
-            except json.decoder.JSONDecodeError as e:
-                print("text is not json", e)
+        manifests.check(json_path)
@@ -0,0 +1,90 @@
+import json
+import os
+import sys
+from .cache import CACHE_DIR, CACHE_VERSION, fingerprint
+
+
+def get_site_paths():
+    """
+    :return: folders on sys.path, installing or removing a distribution changes their mtime
+    """
+    return [path for path in sys.path if path and os.path.isdir(path)]
+
+
+def scan_entry_points(group):
+    """
+    Read the entry points of a group from the metadata of every installed distribution
+    :param group: entry point group name
+    :return: list of {"name": entry point name, "value": "module:attribute"}
+    """
+    try:
+        from importlib.metadata import entry_points
+    except ImportError:
+        from importlib_metadata import entry_points
+
+    found = entry_points()
+    if hasattr(found, "select"):
+        found = found.select(group=group)
+    else:
+        found = found.get(group, [])
+
+    entries = {}
+    for entry_point in found:
+        # the first distribution on sys.path wins as for imports
+        entries.setdefault(entry_point.name, {"name": entry_point.name, "value": entry_point.value})
+    return sorted(entries.values(), key=lambda entry: entry["name"])
+
+
+class EntryPointIndex:
+
+    def __init__(self, base_path, group):
+        """
+        On-disk index of the plugins registered by installed distributions under one entry point group
+        :param base_path: folder of the plugin discovering the entry points, the index is kept in its .metacli_cache
+        :param group: entry point group name
+        """
+        self.group = group
+        self.cache_path = os.path.join(str(base_path), CACHE_DIR, "entry_points." + group + ".json")
+
+    def read(self):
+        try:
+            with open(self.cache_path) as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return None
+
+        if not isinstance(data, dict) or data.get("version") != CACHE_VERSION:
+            return None
+        return data
+
+    def get_entries(self):
+        """
+        :return: list of entry points, scanned again only when a folder on sys.path changed
+        """
+        site_paths = get_site_paths()
+        data = self.read()
+        if data is not None and data["sources"] == fingerprint(site_paths):
+            return data["entries"]
+
+        entries = scan_entry_points(self.group)
+        self.save({"version": CACHE_VERSION, "sources": fingerprint(site_paths), "entries": entries})
+        return entries
+
+    def save(self, data):
+        """ Write the index file, a read-only plugin folder just scans on every start """
+        tmp_path = self.cache_path + "." + str(os.getpid())
+        try:
+            os.makedirs(os.path.dirname(self.cache_path), exist_ok=True)
+            with open(tmp_path, "w") as f:
+                json.dump(data, f)
+            os.replace(tmp_path, self.cache_path)
+        except OSError:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def get_manifest(self):
+        """
+        :return: plugin json data with one module per entry point, loaded lazily by PluginLoader
+        """
+        return {"modules": [{"name": entry["name"], "entry_point": entry["value"]}
+                            for entry in self.get_entries()]}
@@ -0,0 +1,100 @@
+import importlib.machinery
+import os
+import sys
+import threading
+from .bundle import find_bundle, spec_from_path
+
+
+class PluginPathFinder:
+
+    def __init__(self):
+        """
+        Resolve top level imports of plugins from their package roots without extending sys.path.
+        Each root is listed once, so an import is a dict lookup instead of probing every plugin folder.
+        Implements the meta path finder protocol without importlib.abc, which is slow to import.
+        """
+        self.roots = []
+        self.index = {}
+        self.lock = threading.Lock()
+
+    def add_root(self, root):
+        """
+        Register a plugin package root, the first registered root wins as sys.path order did
+        :param root: absolute plugin package path
+        """
+        with self.lock:
+            if root in self.roots:
+                return
+            self.roots.append(root)
+            for name, entry in self.list_root(root).items():
+                self.index.setdefault(name, (root, entry))
+
+    def list_root(self, root):
+        """
+        :param root: plugin package path
+        :return: dict as {module name: (file location or None for namespace package, package search locations)},
+                 entries of a plugin folder are None, they are resolved by PathFinder in the folder
+        """
+        bundle = find_bundle(root)
+        if bundle is not None:
+            return bundle.list_root(root)
+
+        modules = {}
+        try:
+            entries = list(os.scandir(root))
+        except OSError:
+            return modules
+
+        # source, bytecode and extension modules, longest suffix first as in .cpython-38-x86_64-linux-gnu.so
+        suffixes = sorted(importlib.machinery.all_suffixes(), key=len, reverse=True)
+        for entry in entries:
+            name = entry.name
+            if not entry.is_dir():
+                name = next((name[:-len(suffix)] for suffix in suffixes if name.endswith(suffix)), "")
+            if name.isidentifier():
+                modules[name] = None
+        return modules
+
+    def find_spec(self, fullname, path=None, target=None):
+        # submodules are found through the package __path__ by the default finders
+        if path is not None:
+            return None
+
+        item = self.index.get(fullname)
+        if item is None:
+            return None
+
+        # the folder is known to contain the module, the default path finder picks its loader
+        root, entry = item
+        if entry is None:
+            return importlib.machinery.PathFinder.find_spec(fullname, [root])
+
+        location, search_locations = entry
+        if location is None:
+            spec = importlib.machinery.ModuleSpec(fullname, None, is_package=True)
+            spec.submodule_search_locations = search_locations
+            return spec
+        return spec_from_path(fullname, location, search_locations)
+
+    def invalidate_caches(self):
+        """ List all roots again, called by importlib.invalidate_caches() """
+        with self.lock:
+            self.index = {}
+            for root in self.roots:
+                for name, entry in self.list_root(root).items():
+                    self.index.setdefault(name, (root, entry))
+
+
+# process wide finder shared by all plugin loaders
+finder = PluginPathFinder()
+
+
+def add_plugin_root(root):
+    """
+    Make modules in a plugin package root importable, the finder is installed after the default
+    finders so installed packages still take precedence as with sys.path.append
+    :param root: absolute plugin package path
+    """
+    if finder not in sys.meta_path:
+        sys.meta_path.append(finder)
+    finder.add_root(root)
@@ -0,0 +1,134 @@
+import collections
+
+# one command / group of a command tree, groups is None for a command
+CommandNode = collections.namedtuple("CommandNode", ["name", "help", "hidden", "params", "commands", "groups"])
+
+# one option / argument, values are strings as in schema json, None for fields an argument does not have
+ParamNode = collections.namedtuple("ParamNode", ["name", "help", "type", "default", "required", "prompt",
+                                                 "param_type"])
+
+
+def build_post_order(root, get_children, make_node):
+    """
+    Build a tree bottom-up with an explicit stack, so deep trees do not hit the recursion limit
+    :param root: root item
+    :param get_children: function returning the list of child items of an item
+    :param make_node: function building a node from an item and the list of its child nodes
+    :return: node of root
+    """
+    nodes = []
+    stack = [(root, None)]
+    while stack:
+        item, children = stack.pop()
+        if children is None:
+            children = get_children(item)
+            stack.append((item, children))
+            stack.extend((child, None) for child in reversed(children))
+        else:
+            start = len(nodes) - len(children)
+            child_nodes = nodes[start:]
+            del nodes[start:]
+            nodes.append(make_node(item, child_nodes))
+    return nodes[0]
+
+
+def param_from_schema(param):
+    return ParamNode(*(param.get(field) for field in ParamNode._fields))
+
+
+def from_schema(schema):
+    """
+    :param schema: list of group dicts in schema json, validated by SchemaValidator
+    :return: tuple of CommandNode, the schema is not modified
+    """
+    def get_children(group):
+        return list(group.get("commands", [])) + list(group.get("groups", []))
+
+    def make_node(group, child_nodes):
+        command_count = len(group.get("commands", []))
+        return CommandNode(name=group["name"],
+                           help=group["help"],
+                           hidden=group["hidden"],
+                           params=tuple(param_from_schema(param) for param in group.get("params", [])),
+                           commands=tuple(child_nodes[:command_count]),
+                           groups=tuple(child_nodes[command_count:]) if "groups" in group else None)
+
+    return tuple(build_post_order(group, get_children, make_node) for group in schema)
+
+
+def shallow_from_schema(group):
+    """
+    :param group: group / command dict in schema json
+    :return: CommandNode of the group itself, without commands and groups
+    """
+    return CommandNode(name=group["name"], help=group["help"], hidden=group["hidden"],
+                       params=tuple(param_from_schema(param) for param in group.get("params", [])),
+                       commands=(), groups=() if "groups" in group else None)
+
+
+def param_from_click(param):
+    """
+    :param param: click.Option / click.Argument
+    :return: ParamNode with str values
+    """
+    import click
+
+    if isinstance(param, click.Option):
+        return ParamNode(name=str(param.name), help=str(param.help), type=str(param.type),
+                         default=str(param.default), required=str(param.required), prompt=str(param.prompt),
+                         param_type="option")
+    return ParamNode(name=str(param.name), help=None, type=str(param.type), default=str(param.default),
+                     required=str(param.required), prompt=None, param_type="argument")
+
+
+def from_click(command):
+    """
+    :param command: click.Command / click.Group, lazy plugins are loaded
+    :return: CommandNode
+    """
+    import click
+    from .plugin import resolve_lazy
+
+    def get_children(cmd):
+        if not isinstance(cmd, click.Group):
+            return []
+        children = [resolve_lazy(obj) for obj in cmd.commands.values()]
+        children = [obj for obj in children if isinstance(obj, click.Command)]
+        # commands first, then groups
+        return [obj for obj in children if not isinstance(obj, click.Group)] + \
+               [obj for obj in children if isinstance(obj, click.Group)]
+
+    def make_node(cmd, child_nodes):
+        is_group = isinstance(cmd, click.Group)
+        command_count = len([node for node in child_nodes if node.groups is None])
+        return CommandNode(name=cmd.name,
+                           help=str(cmd.help),
+                           hidden=str(cmd.hidden),
+                           params=tuple(param_from_click(param) for param in cmd.params),
+                           commands=tuple(child_nodes[:command_count]) if is_group else (),
+                           groups=tuple(child_nodes[command_count:]) if is_group else None)
+
+    return build_post_order(command, get_children, make_node)
+
+
+def param_to_dict(param):
+    return {field: value for field, value in zip(ParamNode._fields, param) if value is not None}
+
+
+def to_schema(node):
+    """
+    :param node: CommandNode
+    :return: dict in schema json layout
+    """
+    def get_children(cmd):
+        return list(cmd.commands) + list(cmd.groups or ())
+
+    def make_node(cmd, child_dicts):
+        schema = {"name": cmd.name, "help": cmd.help, "hidden": cmd.hidden}
+        if cmd.groups is not None:
+            schema["groups"] = child_dicts[len(cmd.commands):]
+            schema["commands"] = child_dicts[:len(cmd.commands)]
+        schema["params"] = [param_to_dict(param) for param in cmd.params]
+        return schema
+
+    return build_post_order(node, get_children, make_node)
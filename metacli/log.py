@@ -0,0 +1,246 @@
+import logging
+import logging.handlers
+import os
+import queue
+import threading
+import time
+
+try:
+    import fcntl
+except ImportError:
+    # no lock between processes on platforms without flock
+    fcntl = None
+
+LOG_FORMAT = '[%(asctime)s] p%(process)s {%(filename)s:%(lineno)d} %(levelname)s - %(message)s'
+LOG_DATE_FORMAT = '%Y-%m-%d %H:%M:%S'
+LOG_MAX_BYTES = 10 * 1024 * 1024
+LOG_BACKUP_COUNT = 5
+LOG_BATCH_SIZE = 256
+LOG_FLUSH_INTERVAL = 0.2
+
+# async handlers of this process, keyed by absolute log file path
+_handlers = {}
+_handlers_lock = threading.Lock()
+
+
+class RotatingBatchFileHandler(logging.Handler):
+
+    def __init__(self, filename, max_bytes=LOG_MAX_BYTES, backup_count=LOG_BACKUP_COUNT, rotate_seconds=None):
+        """
+        Append batches of records to a log file shared by several processes. Every batch is
+        written under an exclusive flock on the log file itself, rotation happens under the same lock.
+        :param filename: log file path
+        :param max_bytes: rotate before the file grows over this size, 0 to disable
+        :param backup_count: number of rotated files kept as <file>.1 ... <file>.n
+        :param rotate_seconds: rotate when the file was last written in an earlier interval, None to disable
+        """
+        logging.Handler.__init__(self)
+        self.baseFilename = os.path.abspath(filename)
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self.rotate_seconds = rotate_seconds
+        self.stream = None
+
+    def emit(self, record):
+        self.emit_batch([record])
+
+    def emit_batch(self, records):
+        """
+        :param records: list of LogRecord, written with one lock and one write
+        """
+        lines = []
+        for record in records:
+            try:
+                lines.append(self.format(record) + "\n")
+            except Exception:
+                self.handleError(record)
+        if not lines:
+            return
+        data = "".join(lines).encode("utf-8")
+
+        self.acquire()
+        try:
+            self.lock_stream()
+            try:
+                self.write(data)
+            finally:
+                self.unlock_stream()
+        except OSError:
+            self.handleError(records[-1])
+        finally:
+            self.release()
+
+    def write(self, data):
+        """ Write data, called with the file lock held """
+        if self.should_rotate(len(data)):
+            self.rotate()
+            self.lock_stream()
+        self.stream.write(data)
+        self.stream.flush()
+
+    def lock_stream(self):
+        """ Open the current log file and hold an exclusive flock on it """
+        while True:
+            self.open_stream()
+            if fcntl is None:
+                return
+            fcntl.flock(self.stream, fcntl.LOCK_EX)
+            # another process may have rotated the file while this one waited for the lock
+            if self.is_current():
+                return
+            fcntl.flock(self.stream, fcntl.LOCK_UN)
+
+    def unlock_stream(self):
+        if self.stream is not None and fcntl is not None:
+            fcntl.flock(self.stream, fcntl.LOCK_UN)
+
+    def is_current(self):
+        """ :return: True if the open stream is still the file at baseFilename """
+        try:
+            return os.stat(self.baseFilename).st_ino == os.fstat(self.stream.fileno()).st_ino
+        except FileNotFoundError:
+            return False
+
+    def open_stream(self):
+        # another process may have rotated the file since the last batch
+        if self.stream is not None and self.is_current():
+            return
+        self.close_stream()
+        self.stream = open(self.baseFilename, "ab")
+
+    def close_stream(self):
+        if self.stream is not None:
+            self.stream.close()
+            self.stream = None
+
+    def should_rotate(self, size):
+        stat = os.fstat(self.stream.fileno())
+        if stat.st_size == 0:
+            return False
+        if self.max_bytes and stat.st_size + size > self.max_bytes:
+            return True
+        if self.rotate_seconds and int(stat.st_mtime // self.rotate_seconds) < int(time.time() // self.rotate_seconds):
+            return True
+        return False
+
+    def rotate(self):
+        """ Move the log file to the backups, called with the lock on the stream held """
+        if self.backup_count <= 0:
+            os.remove(self.baseFilename)
+        else:
+            for index in range(self.backup_count - 1, 0, -1):
+                source = "{}.{}".format(self.baseFilename, index)
+                if os.path.exists(source):
+                    os.replace(source, "{}.{}".format(self.baseFilename, index + 1))
+            os.replace(self.baseFilename, self.baseFilename + ".1")
+        # closing releases the lock, waiting processes then find the file rotated and reopen
+        self.close_stream()
+
+    def close(self):
+        self.acquire()
+        try:
+            self.close_stream()
+        finally:
+            self.release()
+        logging.Handler.close(self)
+
+
+class AsyncLogHandler(logging.handlers.QueueHandler):
+
+    def __init__(self, file_handler, batch_size=LOG_BATCH_SIZE, flush_interval=LOG_FLUSH_INTERVAL):
+        """
+        Put records on a queue, a writer thread passes them to the file handler in batches
+        :param file_handler: RotatingBatchFileHandler
+        :param batch_size: most records written at once
+        :param flush_interval: seconds the writer waits to fill a batch
+        """
+        logging.handlers.QueueHandler.__init__(self, queue.Queue())
+        self.file_handler = file_handler
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.pid = None
+        self.thread = None
+        self.start()
+
+    @property
+    def baseFilename(self):
+        return self.file_handler.baseFilename
+
+    def start(self):
+        self.pid = os.getpid()
+        self.queue = queue.Queue()
+        self.thread = threading.Thread(target=self.write_batches, name="metacli-log-writer", daemon=True)
+        self.thread.start()
+
+    def enqueue(self, record):
+        # the writer thread does not exist in a forked child, e.g. a daemon invocation
+        if self.pid != os.getpid():
+            self.file_handler.createLock()
+            # a flock is shared with the parent through the inherited file descriptor
+            self.file_handler.close_stream()
+            self.start()
+        self.queue.put_nowait(record)
+
+    def write_batches(self):
+        while True:
+            batch, marker = self.collect_batch()
+            if batch:
+                self.file_handler.emit_batch(batch)
+            if isinstance(marker, threading.Event):
+                marker.set()
+            elif marker is None:
+                return
+
+    def collect_batch(self):
+        """
+        Wait for records until the batch is full, the flush interval passed or a marker is queued
+        :return: (list of LogRecord, flush Event / None for stop / False for a full batch)
+        """
+        batch = []
+        item = self.queue.get()
+        deadline = time.monotonic() + self.flush_interval
+        while isinstance(item, logging.LogRecord):
+            batch.append(item)
+            if len(batch) >= self.batch_size:
+                return batch, False
+            try:
+                item = self.queue.get(timeout=max(deadline - time.monotonic(), 0))
+            except queue.Empty:
+                return batch, False
+        return batch, item
+
+    def flush(self):
+        """ Wait until all queued records are written """
+        if self.thread is None or not self.thread.is_alive() or self.pid != os.getpid():
+            return
+        done = threading.Event()
+        self.queue.put_nowait(done)
+        done.wait(5)
+
+    def close(self):
+        """ Write the remaining records and stop the writer thread, called by logging.shutdown at exit """
+        if self.thread is not None and self.thread.is_alive() and self.pid == os.getpid():
+            self.queue.put_nowait(None)
+            self.thread.join(5)
+        self.thread = None
+        self.file_handler.close()
+        with _handlers_lock:
+            if _handlers.get(self.baseFilename) is self:
+                del _handlers[self.baseFilename]
+        logging.handlers.QueueHandler.close(self)
+
+
+def get_log_handler(filename, **kwargs):
+    """
+    :param filename: log file path
+    :param kwargs: max_bytes / backup_count / rotate_seconds of RotatingBatchFileHandler
+    :return: AsyncLogHandler of the file, created once per process
+    """
+    path = os.path.abspath(filename)
+    with _handlers_lock:
+        handler = _handlers.get(path)
+        if handler is None:
+            file_handler = RotatingBatchFileHandler(path, **kwargs)
+            file_handler.setFormatter(logging.Formatter(LOG_FORMAT, LOG_DATE_FORMAT))
+            handler = _handlers[path] = AsyncLogHandler(file_handler)
+        return handler
@@ -0,0 +1,100 @@
+import json
+import os
+import threading
+from .cache import fingerprint
+
+# the kind of json we expect in plugin_commands.json
+MANIFEST_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "name": {"type": "string"},
+        "click_root": {"type": "string"},
+        "file_path": {"type": "string"},
+        "package_path": {"type": "string"},
+        "package_name": {"type": "string"}
+    }
+}
+
+
+class ManifestRegistry:
+
+    def __init__(self, schema=MANIFEST_SCHEMA):
+        """
+        Process wide plugin json files, each file is read, parsed and validated once
+        and only read again when its mtime or size changed
+        :param schema: json schema plugin json files are validated against
+        """
+        self.schema = schema
+        self.validator = None
+        self.entries = {}
+        self.lock = threading.Lock()
+
+    def get_validator(self):
+        """
+        :return: jsonschema validator for the schema, the schema itself is only checked once
+        """
+        if self.validator is None:
+            import jsonschema
+
+            validator_class = jsonschema.validators.validator_for(self.schema)
+            validator_class.check_schema(self.schema)
+            self.validator = validator_class(self.schema)
+        return self.validator
+
+    def load(self, json_path):
+        """
+        :param json_path: plugin json path
+        :return: parsed plugin json data, shared by all callers and must not be modified
+        :raise json.decoder.JSONDecodeError: the file is not json
+        """
+        json_path = os.path.abspath(json_path)
+        file_fingerprint = fingerprint([json_path])[json_path]
+        with self.lock:
+            entry = self.entries.get(json_path)
+
+        if entry is None or entry["fingerprint"] != file_fingerprint:
+            entry = self.parse(json_path, file_fingerprint)
+            with self.lock:
+                self.entries[json_path] = entry
+
+        if entry["error"] is not None:
+            raise entry["error"]
+        return entry["data"]
+
+    def parse(self, json_path, file_fingerprint):
+        """
+        Read and validate a plugin json, problems are reported once per file version
+        :param json_path: absolute plugin json path
+        :param file_fingerprint: [mtime_ns, size] of the file before reading
+        :return: dict of fingerprint, data and json decode error
+        """
+        import jsonschema
+
+        entry = {"fingerprint": file_fingerprint, "data": None, "error": None}
+        with open(json_path) as f:
+            try:
+                entry["data"] = json.load(f)
+            except json.decoder.JSONDecodeError as e:
+                print("text is not json", e)
+                entry["error"] = e
+                return entry
+
+        # validate given json is same as what is described in schema
+        error = jsonschema.exceptions.best_match(self.get_validator().iter_errors(entry["data"]))
+        if error is not None:
+            print("invalid json", error)
+        return entry
+
+    def check(self, json_path):
+        """
+        Report an invalid plugin json without raising
+        :param json_path: plugin json path
+        """
+        try:
+            self.load(json_path)
+        except json.decoder.JSONDecodeError:
+            pass
+
+
+# process wide plugin json files shared by plugin loaders, bundles and dependency management
+manifests = ManifestRegistry()
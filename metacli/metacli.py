@@ -1,11 +1,10 @@
 import click
-import yaml
-import jinja2
 import os
-import pathlib
 import json
 from .schema import *
 from .dependency_management import DependencyManagement
+from .bundle import BundleBuilder
+from .batch import find_schemas, generate_projects
 
 
 @click.group()
@@ -25,6 +24,21 @@ def dependency_management(ctx):
     dm.gather_packages_for_plugins_and_check_conflicts()
 
 
+@metacli.command("bundle")
+@click.option("--cli", help="cli.py of the base plugin", required=True)
+@click.option("--root", help="root command / group in cli.py of the base plugin", required=True)
+@click.option("--output", help="archive file to write", required=True)
+@click.option("--json_file", help="plugin json name in every plugin folder", default="plugin_commands.json")
+@click.pass_context
+def bundle(ctx, cli, root, output, json_file):
+    """ Pack base plugin and all its plugins into one executable archive"""
+    click.echo("bundling plugins of " + cli)
+
+    builder = BundleBuilder(cli, root, json_file=json_file)
+    count = builder.build(output)
+    click.echo("wrote {} python files into {}".format(count, output))
+
+
 def get_project_path_and_name():
     project_path = input("input project path (default: ./): ")
     project_name = input("project name (default: helloworld): ")
@@ -44,66 +58,100 @@ def get_project_path_and_name():
 @click.option("--fromjson", help="input your schema json file", default="")
 @click.option("--fromyaml", help="input your schema yaml file", default="")
 @click.option("--include_template", default=False)
+@click.option("--template_dir", multiple=True, help="folder of templates overriding built-in templates")
 @click.pass_context
-def create_project(ctx, fromjson, fromyaml, include_template):
+def create_project(ctx, fromjson, fromyaml, include_template, template_dir):
     """crate new project from schema.yaml or schema.json"""
-
     project_path, project_name = get_project_path_and_name()
 
     # initial project path and command line folder path
     project_path = project_path + '/' + project_name
 
-    # initial project generator
-    generator = ProjectGenerator(project_path, project_name)
+    schema = None
+    if fromjson != "" or fromyaml != "":
+        # generate file based on input schema
+        schema = load_schema(fromjson, fromyaml)
+    generate_project(project_path, project_name, schema, include_template, template_dirs=template_dir)
+
+    # show generated file's structure
+    list_files(project_path)
 
-    # load template engine
-    parent_path = str(pathlib.Path(__file__).parent)
-    loader = jinja2.FileSystemLoader(searchpath=parent_path + '/templates')
-    env = jinja2.Environment(loader=loader)
 
+@metacli.command("update_project")
+@click.option("--fromjson", help="input your schema json file", default="")
+@click.option("--fromyaml", help="input your schema yaml file", default="")
+@click.option("--include_template", default=False)
+@click.option("--template_dir", multiple=True, help="folder of templates overriding built-in templates")
+@click.pass_context
+def update_project(ctx, fromjson, fromyaml, include_template, template_dir):
+    """update project generated from schema.yaml or schema.json, only changed files are written"""
     if fromjson == "" and fromyaml == "":
-        # initial hello world project with cli.py, setup.py, init.py, plugin_commands.json
-        templates_name = ['__init__.txt', 'setup.txt', 'cli.txt', 'plugin_commands.txt']
-        templates = [env.get_template(name) for name in templates_name]
-        names = ['__init__.py', 'setup.py', project_name + 'cli.py', 'plugin_commands.json']
-        output, path = generator.create_empty_files(templates, names, project_name)
+        raise click.UsageError("update_project needs --fromjson or --fromyaml")
+
+    project_path, project_name = get_project_path_and_name()
+    project_path = project_path + '/' + project_name
+
+    # keep the project and the state of its last generation, changed templates render everything again
+    env = get_template_env(template_dir)
+    generator = ProjectGenerator(project_path, project_name, update=True,
+                                 templates_hash=get_templates_hash(env, template_dir))
+    schema = load_schema(fromjson, fromyaml)
+    if generator.is_up_to_date(schema, include_template):
+        click.echo("project is up to date")
+        return
+
+    # unchanged commands / groups are taken from the state instead of being rendered
+    root_name = schema[0]['name']
+    cli_output, cli_path = generator.generate_cli_incremental(env, schema, root_name)
+
+    templates_name = ['__init__.txt', 'setup.txt', 'plugin_commands.txt']
+    templates = [env.get_template(name) for name in templates_name]
+    names = ['__init__.py', 'setup.py', 'plugin_commands.json']
+    output, path = generator.create_empty_files(templates, names, root_name)
+    output.append(cli_output)
+    path.append(cli_path)
 
-    else:
-        # generate file based on input schema
-        validator = SchemaValidator()
-
-        if fromjson != "":
-            with open(fromjson) as json_file:
-                schema = json.load(json_file)
-                validator.validate_json(schema)
-        elif fromyaml != "":
-            with open(fromyaml) as yaml_file:
-                schema = yaml.load(yaml_file, yaml.FullLoader)
-                validator.validate_json(schema)
-
-        # generate cli file from data (only support one root now)
-        root_name = schema[0]['name']
-        cli_output, cli_path = generator.generate_cli_from_data(env, schema, root_name)
-
-        # generate setup.py, plugin_commands.json, __init__.py
-        templates_name = ['__init__.txt', 'setup.txt', 'plugin_commands.txt']
-        templates = [env.get_template(name) for name in templates_name]
-        names = ['__init__.py', 'setup.py', 'plugin_commands.json']
-        output, path = generator.create_empty_files(templates, names, root_name)
-
-        # add cli.py to output
-        output.append(cli_output)
-        path.append(cli_path)
-
-    # add schema.json & schema.yaml
     if include_template:
         output, path = generator.append_schema_template(env, output, path)
 
-    # output all files
-    generator.write_files(output, path)
+    written = generator.update_files(output, path, schema, include_template)
+    click.echo("rendered {} commands / groups, wrote {} of {} files".format(
+        generator.rendered, len(written), len(path)))
+    for file in written:
+        click.echo("  " + file)
 
-    # show generated file's structure
-    list_files(project_path)
+
+@metacli.command("batch_create_projects")
+@click.argument("schemas")
+@click.option("--output", help="folder the projects are created in", required=True)
+@click.option("--workers", help="number of worker processes, default number of cpus", type=int, default=None)
+@click.option("--include_template", default=False)
+@click.option("--template_dir", multiple=True, help="folder of templates overriding built-in templates")
+@click.option("--overwrite", is_flag=True, help="replace existing project folders")
+@click.pass_context
+def batch_create_projects(ctx, schemas, output, workers, include_template, template_dir, overwrite):
+    """create one project per schema file in a folder or glob, without prompts, results as json lines"""
+    schema_paths = find_schemas(schemas)
+    if not schema_paths:
+        raise click.UsageError("no schema json / yaml found in " + schemas)
+
+    failed = 0
+    for record in generate_projects(schema_paths, output, workers, include_template, overwrite,
+                                    template_dir):
+        if record["status"] != "ok":
+            failed += 1
+        click.echo(json.dumps(record))
+    if failed:
+        ctx.exit(1)
+
+
+@metacli.command("precompile_templates")
+@click.option("--template_dir", multiple=True, help="folder of templates overriding built-in templates")
+@click.pass_context
+def precompile(ctx, template_dir):
+    """compile project templates into the bytecode cache, e.g. after installing metacli"""
+    names = precompile_templates(template_dir)
+    click.echo("compiled {} templates into {}".format(len(names), get_template_cache_dir()))
 
 
 if __name__ == '__main__':
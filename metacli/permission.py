@@ -0,0 +1,156 @@
+import threading
+import time
+import weakref
+import click
+
+PERMISSION_FILE = ".temp.txt"
+
+# permission levels from lowest to highest
+PERMISSION_LEVELS = ("user", "developer")
+
+# level used when there is no permission file
+DEFAULT_LEVEL = "developer"
+
+# seconds a level in permission file stays valid after its timestamp
+PERMISSION_TTL = 24 * 60 * 60
+
+
+class PermissionManager:
+
+    def __init__(self, path=PERMISSION_FILE, ttl=PERMISSION_TTL):
+        """
+        Read the user level once per process and keep one filtered command view per level for every group.
+        The permission file contains one line as <level>$<timestamp>.
+        :param path: permission file path
+        :param ttl: seconds the level stays valid after its timestamp
+        """
+        self.path = path
+        self.ttl = ttl
+        self.level = None
+        self.expires = 0
+        self.views = weakref.WeakKeyDictionary()
+        self.lock = threading.Lock()
+        self.show_all = False
+
+    def get_user_level(self):
+        """
+        :return: current user level, permission file is read again only after the level expired
+        """
+        now = time.time()
+        if self.level is None or now >= self.expires:
+            self.level, self.expires = self.read_user_level(now)
+        return self.level
+
+    def read_user_level(self, now):
+        """
+        :param now: current time
+        :return: (user level, expiry time)
+        """
+        try:
+            with open(self.path, "r") as f:
+                level, timestamp = f.readline().rstrip().split("$")
+            expires = float(timestamp) + self.ttl
+        except OSError:
+            return DEFAULT_LEVEL, now + self.ttl
+        except ValueError:
+            return PERMISSION_LEVELS[0], now + self.ttl
+
+        # an expired or unknown level falls back to the lowest level
+        if level not in PERMISSION_LEVELS or expires <= now:
+            return PERMISSION_LEVELS[0], now + self.ttl
+        return level, expires
+
+    def get_view_level(self):
+        """
+        :return: level plugins loaded now are filtered for, None after unrestrict
+        """
+        return None if self.show_all else self.get_user_level()
+
+    def get_command_level(self, command):
+        """
+        :param command: click.Command, "permission" can be set in plugin json or on the command
+        :return: level required to use the command
+        """
+        level = getattr(command, "permission", None)
+        return level if level in PERMISSION_LEVELS else PERMISSION_LEVELS[0]
+
+    def is_allowed(self, permission, level):
+        """
+        :param permission: level required by a command, unknown levels require the lowest level
+        :param level: user level, None allows every command
+        :return: True if the command is available for the level
+        """
+        if level is None:
+            return True
+        required = permission if permission in PERMISSION_LEVELS else PERMISSION_LEVELS[0]
+        return PERMISSION_LEVELS.index(required) <= PERMISSION_LEVELS.index(level)
+
+    def get_all_commands(self, group):
+        """
+        :param group: click.Group, may be restricted to a view
+        :return: commands dict of the group before it was restricted
+        """
+        with self.lock:
+            views = self.views.get(group)
+        return self.get_views(group)[None] if views is not None else group.commands
+
+    def get_views(self, group):
+        """
+        :param group: click.Group
+        :return: dict as {level: commands dict}, None maps to all commands
+        """
+        with self.lock:
+            views = self.views.get(group)
+            if views is None:
+                commands = group.commands
+                views = {None: commands}
+                for level in PERMISSION_LEVELS:
+                    views[level] = {name: cmd for name, cmd in commands.items()
+                                    if self.is_allowed(self.get_command_level(cmd), level)}
+                self.views[group] = views
+            elif group.commands is not views[None]:
+                self.add_to_views(views, group.commands)
+            return views
+
+    def add_to_views(self, views, commands):
+        """
+        Commands added to a restricted group, e.g. by decorators applied after loadPlugin, only went into
+        the view the group shows, add them to the other views too
+        :param views: dict as {level: commands dict} of the group
+        :param commands: commands dict the group shows
+        """
+        for name, cmd in commands.items():
+            if name in views[None]:
+                continue
+            views[None][name] = cmd
+            for level in PERMISSION_LEVELS:
+                if self.is_allowed(self.get_command_level(cmd), level):
+                    views[level][name] = cmd
+                else:
+                    views[level].pop(name, None)
+
+    def get_view(self, group, level=None):
+        """
+        :param group: click.Group
+        :param level: permission level, None for all commands
+        :return: commands dict of the group available for the level
+        """
+        return self.get_views(group)[level]
+
+    def restrict(self, group):
+        """ Only show commands of the group available for the user level """
+        group.commands = self.get_view(group, self.get_user_level())
+
+    def unrestrict(self, command):
+        """ Show all commands of every group in the tree and of plugins loaded later, used by shell """
+        self.show_all = True
+        if not isinstance(command, click.Group):
+            return
+        if command in self.views:
+            command.commands = self.get_view(command)
+        for cmd in command.commands.values():
+            self.unrestrict(cmd)
+
+
+# process wide permission manager shared by all plugin loaders
+permissions = PermissionManager()
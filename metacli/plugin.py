@@ -1,39 +1,198 @@
 import pathlib
-import sys
 import inspect
+import importlib
 import importlib.util
 import click
-import os
+import threading
+from .bundle import spec_from_path
+from .cache import build_command, describe_command, fingerprint, is_complete, get_recorders, record_source, recording
+from .finder import add_plugin_root
+from .permission import permissions
+from .profiler import profiler
 
 
 class PluginLoader:
 
-    def __init__(self, parent_plugin, base_path):
+    def __init__(self, parent_plugin, base_path, lazy=False, cache=None, workers=None):
         self.parent_plugin = parent_plugin
         self.base_path = base_path
+        self.lazy = lazy
+        self.cache = cache
+        self.workers = workers
 
     def load_plugin(self, command_data):
 
-        for module in command_data["modules"]:
+        modules = command_data["modules"]
+        placeholders = {}
+        pending = []
+        for index, module in enumerate(modules):
 
-            # get cli.py path
-            package_name, package_path = module["package_name"], module['package_path']
-            file_path = package_path + package_name.replace('.', '/') + '.py'
-            file_path = self.parse_to_absolute_path(file_path)
+            # unchanged plugin in cache is registered from cached info without importing it
+            if self.cache is not None:
+                info = self.cache.get(module)
+                if info is not None:
+                    placeholders[index] = LazyPluginGroup(self, module, info=info)
+                    continue
 
-            # get module absolute path to support relative import
-            package_path = str((self.base_path / pathlib.Path(package_path)).resolve())
-            sys.path.append(package_path)
+            # lazy mode only registers a placeholder, the module is loaded on first use
+            elif self.lazy:
+                placeholders[index] = LazyPluginGroup(self, module)
+                continue
 
-            # load next plugin as dfs
-            module_loaded = self.dynamic_load_from_path(package_name, file_path)
-            # add subgroup into current group
-            parent_command_name = module["click_root"]
-            for name, obj in inspect.getmembers(module_loaded):
-                if self.base_filter(obj, parent_command_name):
-                    self.inject_attribute(obj, name=module['name'])
+            pending.append(index)
+
+        loaded = dict(zip(pending, self.load_modules([modules[index] for index in pending])))
+
+        # add subgroups into current group in manifest order
+        for index, module in enumerate(modules):
+            if index in placeholders:
+                self.parent_plugin.add_command(placeholders[index])
+                continue
+
+            commands, sources = loaded[index]
+            for obj in commands:
+                with profiler.section("add_command", obj.name):
                     self.parent_plugin.add_command(obj)
 
+            if self.cache is not None and commands:
+                self.cache.put(module, describe_command(commands[-1]), sources)
+
+        if self.cache is not None:
+            self.cache.save()
+
+    def load_modules(self, modules):
+        """
+        Load plugin modules, siblings are imported concurrently when workers is set
+        :param modules: entries of "modules" in plugin json
+        :return: list of (commands, source files) in the same order as modules
+        """
+        if not self.workers or len(modules) < 2:
+            return [self.record_module(module) for module in modules]
+
+        from concurrent.futures import ThreadPoolExecutor
+
+        inherited = list(get_recorders())
+        parent_node = profiler.current()
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            # package paths are registered in manifest order, same as serial loading
+            paths = list(executor.map(self.get_module_paths, modules))
+            for file_path, package_path in paths:
+                self.add_package_path(package_path)
+
+            file_paths = [file_path for file_path, package_path in paths]
+            return list(executor.map(lambda module, file_path: self.record_module(module, file_path, inherited,
+                                                                                  parent_node),
+                                     modules, file_paths))
+
+    def record_module(self, module, file_path=None, inherited=None, parent_node=None):
+        """
+        Load one plugin module and collect the source files of its subtree
+        :param module: one entry of "modules" in plugin json
+        :param file_path: resolved cli.py path when package path is already added
+        :param inherited: recorders of the thread which started loading
+        :param parent_node: profile step of the thread which started loading
+        :return: (commands, source files)
+        """
+        with recording(inherited) as sources, profiler.inheriting(parent_node), \
+                profiler.section("plugin", module["name"]):
+            if file_path is None:
+                commands = self.load_module(module)
+            else:
+                commands = self.import_module(module, file_path)
+        return commands, sources
+
+    def load_module(self, module):
+        """
+        Load one plugin module described in plugin json and collect its root commands
+        :param module: one entry of "modules" in plugin json
+        :return: list of click.Command / click.Group matching click_root
+        """
+        if "entry_point" in module:
+            return self.load_entry_point(module)
+
+        file_path, package_path = self.get_module_paths(module)
+        self.add_package_path(package_path)
+        return self.import_module(module, file_path)
+
+    def load_entry_point(self, module):
+        """
+        Import the command an installed distribution registered as entry point
+        :param module: module entry of EntryPointIndex with "entry_point" as "module:attribute"
+        :return: list with the click.Command / click.Group, empty if the entry point is no command
+        """
+        module_name, _, attribute = module["entry_point"].partition(":")
+        with profiler.section("load", module_name):
+            obj = importlib.import_module(module_name)
+        for name in filter(None, attribute.strip().split(".")):
+            obj = getattr(obj, name)
+
+        if not isinstance(obj, click.Command):
+            return []
+        self.base_filter(obj, obj.name)
+        self.inject_attribute(obj, name=module["name"])
+        return [obj]
+
+    def get_module_paths(self, module):
+        """
+        :param module: one entry of "modules" in plugin json
+        :return: absolute cli.py path and absolute package path of the plugin
+        """
+        # plugin json in a bundle is resolved when the bundle is built
+        if "file" in module:
+            return module["file"], module["package_root"]
+
+        # get cli.py path
+        package_name, package_path = module["package_name"], module['package_path']
+        file_path = package_path + package_name.replace('.', '/') + '.py'
+        file_path = self.parse_to_absolute_path(file_path)
+
+        # get module absolute path to support relative import
+        package_path = str((self.base_path / pathlib.Path(package_path)).resolve())
+
+        return file_path, package_path
+
+    def add_package_path(self, package_path):
+        add_plugin_root(package_path)
+
+    def import_module(self, module, file_path):
+        """
+        Execute plugin cli.py and collect its root commands
+        :param module: one entry of "modules" in plugin json
+        :param file_path: absolute cli.py path
+        :return: list of click.Command / click.Group matching click_root
+        """
+        package_name = module["package_name"]
+
+        # load next plugin as dfs
+        record_source(file_path)
+        module_loaded = self.dynamic_load_from_path(package_name, file_path)
+
+        # collect subgroup for current group
+        commands = []
+        parent_command_name = module["click_root"]
+        for obj in self.find_root_candidates(module_loaded, parent_command_name):
+            if self.base_filter(obj, parent_command_name):
+                # click_root is kept, a module shared by several parents is found again after name is replaced
+                self.inject_attribute(obj, **{key: module[key] for key in ("name", "permission", "click_root")
+                                              if key in module})
+                commands.append(obj)
+
+        return commands
+
+    def find_root_candidates(self, module_loaded, parent_command_name):
+        """
+        Get objects which may be click_root of a plugin module. Commands exported in
+        __metacli_commands__ are looked up directly, other modules are scanned.
+        :param module_loaded: plugin module
+        :param parent_command_name: click_root in plugin json
+        :return: list of objects
+        """
+        exported = getattr(module_loaded, "__metacli_commands__", None)
+        if isinstance(exported, dict) and parent_command_name in exported:
+            return [exported[parent_command_name]]
+
+        return [obj for name, obj in inspect.getmembers(module_loaded)]
+
     def inject_attribute(self, obj, **kwargs):
         """
         inject fields from json file
@@ -57,37 +216,224 @@ class PluginLoader:
         :return: boolean
         """
 
-        # Filter out subcommands available for use if plugin run from terminal
-        permission_commands = self.filter_commands_by_permission_status(obj)
-        if isinstance(obj, click.Command) and permission_commands and "shell" not in sys.argv:
-            obj.commands = permission_commands
+        # Filter out subcommands not available for the user level, shell shows all of them again
+        if isinstance(obj, click.Group):
+            obj.commands = self.filter_commands_by_permission_status(obj)
 
+        # name may have been replaced by the name in json of another parent, click_root stays
         return isinstance(obj, click.Command) \
-               and obj.name == parent_command_name
+               and getattr(obj, "click_root", obj.name) == parent_command_name
 
     def filter_commands_by_permission_status(self, obj):
-        permission_commands = {}
-        functionlevel = "developer"
-
-        userlevel = "developer"
-        if os.path.exists(".temp.txt"):
-            with open(".temp.txt", "r") as f:
-                userlevel, timestamp = f.readline().rstrip().split("$")
-
-        if isinstance(obj, click.Command):
-            if "commands" in obj.__dict__:
-                for cmd in obj.__dict__["commands"]:
-                    cmd_obj = obj.__dict__["commands"][cmd]
-                    permission_commands[cmd] = cmd_obj
-
-        return permission_commands
+        """
+        :param obj: click.Group
+        :return: precomputed commands dict of the group for the user level
+        """
+        return permissions.get_view(obj, permissions.get_view_level())
 
     def dynamic_load_from_path(self, module_name, path):
-        spec = importlib.util.spec_from_file_location(module_name, path)
-        mod = importlib.util.module_from_spec(spec)
-        spec.loader.exec_module(mod)
-        return mod
+        with profiler.section("load", path):
+            return registry.load(module_name, path)
 
     def parse_to_absolute_path(self, next_path):
         """ current cli.py absolute path + relative next plugin path = absolute next plugin path"""
         return str((self.base_path / pathlib.Path(next_path)).resolve())
+
+
+class PluginModuleRegistry:
+
+    def __init__(self):
+        """
+        Process wide registry of plugin modules keyed by resolved cli.py path, so a plugin
+        reachable from several parents or root commands is only executed once.
+        A module is executed again when its file changed.
+        """
+        self.modules = {}
+        self.fingerprints = {}
+        self.sources = {}
+        self.path_locks = {}
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def load(self, module_name, path):
+        """
+        :param module_name: module name used for the first execution
+        :param path: resolved cli.py path
+        :return: loaded module
+        """
+        with self.lock:
+            path_lock = self.path_locks.setdefault(path, threading.RLock())
+
+        with path_lock:
+            module = self.modules.get(path)
+            file_fingerprint = fingerprint([path])
+            if module is None or self.fingerprints[path] != file_fingerprint:
+                with recording() as sources:
+                    spec = spec_from_path(module_name, path)
+                    module = importlib.util.module_from_spec(spec)
+                    spec.loader.exec_module(module)
+                self.modules[path] = module
+                self.fingerprints[path] = file_fingerprint
+                self.sources[path] = sources
+                with self.lock:
+                    self.misses += 1
+            else:
+                # files read by the first execution still belong to this plugin subtree
+                for source in self.sources[path]:
+                    record_source(source)
+                with self.lock:
+                    self.hits += 1
+
+        return module
+
+    def stats(self):
+        """
+        :return: dict of registry hits, misses and loaded module count for diagnostics
+        """
+        with self.lock:
+            return {"hits": self.hits, "misses": self.misses, "modules": len(self.modules)}
+
+
+# process wide plugin modules shared by all plugin loaders
+registry = PluginModuleRegistry()
+
+
+class LazyPluginGroup(click.Group):
+
+    def __init__(self, loader, module, info=None):
+        """
+        Placeholder registered for a plugin in lazy mode. The plugin module is only executed
+        when the placeholder is reached by command resolution or invocation.
+        :param loader: PluginLoader of the parent plugin
+        :param module: one entry of "modules" in plugin json
+        :param info: cached command tree info of the plugin
+        """
+        if info is None:
+            click.Group.__init__(self, name=module["name"], help=module.get("help"))
+        else:
+            click.Group.__init__(self, name=module["name"], help=info["help"],
+                                 short_help=info["short_help"], hidden=info["hidden"])
+        self.loader = loader
+        self.module = module
+        self.info = info
+        # permission of plugin json, filtered by the parent before the plugin is loaded
+        self.permission = module.get("permission")
+        self.resolved = None
+        self.shadow = None
+        self.shadow_level = None
+
+    def resolve(self):
+        """
+        Load the plugin module and replace the placeholder in its parent group
+        :return: the real click.Command / click.Group of the plugin
+        """
+        if self.resolved is None:
+            with profiler.section("plugin", self.module["name"]):
+                commands = self.loader.load_module(self.module)
+            if not commands and "entry_point" in self.module:
+                raise click.ClickException("Entry point " + self.module["entry_point"] +
+                                           " of plugin " + self.module["name"] + " is not a click command")
+            if not commands:
+                raise click.ClickException("Cannot find click_root " + self.module["click_root"] +
+                                           " in plugin " + self.module["package_name"])
+            self.resolved = commands[-1]
+
+            # later lookups in parent go to the real command directly
+            parent_commands = self.loader.parent_plugin.commands
+            if parent_commands.get(self.name) is self:
+                parent_commands[self.name] = self.resolved
+
+        return self.resolved
+
+    def get_shadow(self):
+        """
+        :return: command tree without callbacks built from cached info for the current user level,
+                 None if the info is incomplete
+        """
+        level = permissions.get_view_level()
+        if (self.shadow is None or self.shadow_level != level) and self.info is not None \
+                and is_complete(self.info):
+            self.shadow = build_command(dict(self.info, name=self.name), level)
+            self.shadow_level = level
+        return self.shadow
+
+    def is_help_requested(self, command, info_name, args, parent):
+        """
+        Follow args through the cached tree as click parses them
+        :param command: shadow of the plugin
+        :param info_name: name the plugin is invoked by
+        :param args: args after the plugin name
+        :param parent: parent context
+        :return: True if a help option of the plugin or of one of its subcommands is given, values of options
+                 and args after -- do not count
+        """
+        ctx = click.Context(command, info_name=info_name, parent=parent, **command.context_settings)
+        index = 0
+        while index < len(args):
+            arg = args[index]
+            index += 1
+            if arg == "--":
+                return False
+            if command.add_help_option and arg in ctx.help_option_names:
+                return True
+
+            option = get_option(command, arg.split("=", 1)[0])
+            if option is not None:
+                # the next args are the value of the option
+                if not option.is_flag and not option.count and "=" not in arg:
+                    index += option.nargs
+            elif isinstance(command, click.Group) and arg in command.commands:
+                command = command.commands[arg]
+                ctx = click.Context(command, info_name=arg, parent=ctx, **command.context_settings)
+        return False
+
+    def make_context(self, info_name, args, parent=None, **extra):
+        # help and shell completion of an unloaded plugin are answered from its cached tree
+        options_given = any(arg and not arg[0].isalnum() for arg in args)
+        if self.resolved is None and (extra.get("resilient_parsing") or options_given):
+            shadow = self.get_shadow()
+            if shadow is not None and (extra.get("resilient_parsing") or
+                                       self.is_help_requested(shadow, info_name, args, parent)):
+                return shadow.make_context(info_name, args, parent=parent, **extra)
+
+        # the returned context belongs to the real command, so click invokes it instead of the placeholder
+        return self.resolve().make_context(info_name, args, parent=parent, **extra)
+
+    def invoke(self, ctx):
+        return self.resolve().invoke(ctx)
+
+    def get_command(self, ctx, cmd_name):
+        command = self.resolve()
+        if isinstance(command, click.MultiCommand):
+            return command.get_command(ctx, cmd_name)
+        return None
+
+    def list_commands(self, ctx):
+        command = self.resolve()
+        if isinstance(command, click.MultiCommand):
+            return command.list_commands(ctx)
+        return []
+
+
+def get_option(command, name):
+    """
+    :param command: click.Command
+    :param name: option name as typed, e.g. --depth
+    :return: click.Option of the command with the name, None if there is none
+    """
+    for param in command.params:
+        if isinstance(param, click.Option) and (name in param.opts or name in param.secondary_opts):
+            return param
+    return None
+
+
+def resolve_lazy(command):
+    """
+    Get the real command for a command which may be a lazy plugin placeholder
+    :param command: click.Command / click.Group / LazyPluginGroup
+    :return: click.Command / click.Group
+    """
+    if isinstance(command, LazyPluginGroup):
+        return command.resolve()
+    return command
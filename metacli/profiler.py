@@ -0,0 +1,164 @@
+import atexit
+import builtins
+import contextlib
+import json
+import os
+import sys
+import threading
+import time
+
+PROFILE_ENV = "METACLI_PROFILE_STARTUP"
+PROFILE_FLAG = "--metacli-profile-startup"
+PROFILE_FILE = "metacli_startup_profile.json"
+
+
+class ProfileNode:
+
+    def __init__(self, kind, name):
+        """
+        One timed step of startup
+        :param kind: startup / manifest / plugin / load / import / add_command
+        :param name: plugin name, file path or module name
+        """
+        self.kind = kind
+        self.name = name
+        self.start = time.perf_counter()
+        self.inclusive = 0.0
+        self.children = []
+
+    def stop(self):
+        self.inclusive = (time.perf_counter() - self.start) * 1000
+
+    @property
+    def exclusive(self):
+        # children loaded by worker threads overlap, their sum can exceed the parent
+        return max(self.inclusive - sum(child.inclusive for child in self.children), 0.0)
+
+    def to_dict(self):
+        return {"kind": self.kind,
+                "name": self.name,
+                "inclusive_ms": round(self.inclusive, 3),
+                "exclusive_ms": round(self.exclusive, 3),
+                "children": [child.to_dict() for child in self.children]}
+
+    def format(self, depth=0):
+        lines = ["{}{} {}  {:.1f} ms / {:.1f} ms".format("  " * depth, self.kind, self.name,
+                                                         self.inclusive, self.exclusive)]
+        for child in self.children:
+            lines.extend(child.format(depth + 1))
+        return lines
+
+
+class StartupProfiler:
+
+    def __init__(self):
+        """
+        Opt-in timing tree of plugin loading, enabled by METACLI_PROFILE_STARTUP=1 or --metacli-profile-startup
+        """
+        self.enabled = False
+        self.configured = False
+        self.root = None
+        self.local = threading.local()
+        self.lock = threading.Lock()
+        self.original_import = None
+
+    def configure(self):
+        """ Check environment and command line once, remove the flag so click does not see it """
+        if self.configured:
+            return
+        self.configured = True
+
+        if PROFILE_FLAG in sys.argv:
+            sys.argv.remove(PROFILE_FLAG)
+            self.enabled = True
+        elif os.environ.get(PROFILE_ENV):
+            self.enabled = True
+
+        if self.enabled:
+            self.root = ProfileNode("startup", os.path.basename(sys.argv[0]))
+            self.original_import = builtins.__import__
+            builtins.__import__ = self.timed_import
+            atexit.register(self.finish)
+
+    def get_stack(self):
+        if not hasattr(self.local, "stack"):
+            self.local.stack = [self.root]
+        return self.local.stack
+
+    def current(self):
+        """
+        :return: step currently running in this thread, handed to worker threads, None if not profiling
+        """
+        if not self.enabled or self.root is None:
+            return None
+        return self.get_stack()[-1]
+
+    @contextlib.contextmanager
+    def inheriting(self, node):
+        """
+        Time the steps of a worker thread under the step of the thread which started it
+        :param node: step from current() of the starting thread, None to keep the stack of this thread
+        """
+        if node is None:
+            yield
+            return
+
+        stack = self.get_stack()
+        saved = list(stack)
+        stack[:] = [node]
+        try:
+            yield
+        finally:
+            stack[:] = saved
+
+    @contextlib.contextmanager
+    def timed_section(self, kind, name):
+        node = ProfileNode(kind, name)
+        stack = self.get_stack()
+        with self.lock:
+            stack[-1].children.append(node)
+        stack.append(node)
+        try:
+            yield node
+        finally:
+            node.stop()
+            stack.pop()
+
+    def section(self, kind, name):
+        """
+        Time one step under the step currently running in this thread
+        :param kind: manifest / plugin / load / add_command
+        :param name: plugin name or file path
+        :return: context manager
+        """
+        if not self.enabled or self.root is None:
+            # suppress without exceptions is a no-op context manager
+            return contextlib.suppress()
+        return self.timed_section(kind, name)
+
+    def timed_import(self, name, globals=None, locals=None, fromlist=(), level=0):
+        # only imports which really load a module are timed, so third-party cost lands under its plugin
+        if level == 0 and name not in sys.modules:
+            with self.timed_section("import", name):
+                return self.original_import(name, globals, locals, fromlist, level)
+        return self.original_import(name, globals, locals, fromlist, level)
+
+    def finish(self):
+        """ Stop profiling and report the tree as text on stderr and as json file """
+        if self.root is None:
+            return
+        builtins.__import__ = self.original_import
+        root, self.root = self.root, None
+        root.stop()
+
+        sys.stderr.write("\n".join(["metacli startup profile (inclusive / exclusive)"] + root.format()) + "\n")
+
+        profile_path = os.environ.get(PROFILE_ENV, "")
+        if not profile_path.endswith(".json"):
+            profile_path = PROFILE_FILE
+        with open(profile_path, "w") as f:
+            json.dump(root.to_dict(), f, indent=2)
+
+
+# process wide profiler shared by all decorators and plugin loaders
+profiler = StartupProfiler()
@@ -1,27 +1,64 @@
+import collections
+import hashlib
+import itertools
 import shutil
+import uuid
 import os
-import jinja2
-from jsonschema import validate
-import click
 import json
 from .util import list_files
+from . import ir
+
+
+TEMPLATE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'templates')
+TEMPLATE_CACHE_ENV = "METACLI_TEMPLATE_CACHE"
+
+# most threads writing the files of one project
+WRITE_WORKERS = 8
+
+# template engine environments of this process, keyed by tuple of user template folders
+_template_envs = {}
+
+# state of a generated project used by update_project, kept in the project folder.
+# rendered commands / groups are kept apart so the up to date check stays small
+PROJECT_STATE = ".metacli_project.json"
+PROJECT_CHUNKS = ".metacli_project.chunks.json"
+PROJECT_STATE_VERSION = 1
 
 
 class ProjectGenerator:
 
-    def __init__(self, project_path, project_name):
+    def __init__(self, project_path, project_name, update=False, overwrite=None, templates_hash=""):
+        """
+        :param project_path: project folder
+        :param project_name: project name
+        :param update: keep an existing project and only write changed files, see update_files
+        :param overwrite: replace an existing project folder, None to ask
+        :param templates_hash: get_templates_hash of the templates used by update, changed templates render again
+        :raise FileExistsError: the project folder exists and is not replaced
+        """
         self.project_path = project_path
         self.project_name = project_name
-
+        self.convertor = DataTypeConvertor()
+        self.state_path = os.path.join(project_path, PROJECT_STATE)
+        self.chunks_path = os.path.join(project_path, PROJECT_CHUNKS)
+        self.chunks = None
+        self.rendered = 0
+        self.schema_hash = None
+        self.templates_hash = templates_hash
+
+        if update:
+            os.makedirs(project_path, exist_ok=True)
+            self.state = self.read_state(self.state_path)
+            return
+        self.state = {"version": PROJECT_STATE_VERSION}
+
+        # an existing project is replaced by write_files once the new one is written
         if os.path.exists(project_path):
-            delete = input("Already Existed, would you want to replace? y/n \n")
-            if delete == 'y' or delete == 'Y':
-                self.clean_project()
-            else:
+            if overwrite is None:
+                overwrite = input("Already Existed, would you want to replace? y/n \n") in ('y', 'Y')
+            if not overwrite:
                 raise FileExistsError
 
-        os.mkdir(project_path)
-
     def create_empty_files(self, templates, names, root_name):
         """
         Generate an empty command line project based on templates and names
@@ -64,97 +101,213 @@ class ProjectGenerator:
     def generate_cli_from_data(self, env, schema, root_name):
         """
         :param env: template engine environment
-        :param schema: schema data
-        :return: generated cli file
+        :param schema: schema data, or tuple of ir.CommandNode built from it
+        :return: generated cli file as iterator of text chunks, rendered while the file is written
         """
+        if not all(isinstance(node, ir.CommandNode) for node in schema):
+            schema = ir.from_schema(schema)
+
         # generate cli file
         # generate cli body
         cli_template = env.get_template('cli_body.txt')
 
-        cli_body_output = ""
-        cli_body_output += self.parse_cli(None, schema, cli_template)
-
         # add header and end to cli
         cli_start_template = env.get_template("cli_start.txt")
         cli_end_template = env.get_template("cli_end.txt")
-        cli_output = cli_start_template.render() + cli_body_output + cli_end_template.render(root=root_name)
+        cli_output = itertools.chain(cli_start_template.generate(),
+                                     self.generate_cli(None, schema, cli_template),
+                                     cli_end_template.generate(root=root_name))
         cli_path = self.project_path + '/' + self.project_name + 'cli.py'
 
         return cli_output, cli_path
 
     def parse_cli(self, parent, data, template):
         """
-        create the cli body based on schema recursively
+        create the cli body based on schema
         :param parent: parent command / group name
-        :param data: current command / group dict
+        :param data: tuple of ir.CommandNode, or list of command / group dicts
         :param template: command / group body template
         :return: generated content for current group / command
         """
+        if not all(isinstance(node, ir.CommandNode) for node in data):
+            data = ir.from_schema(data)
+        return "".join(self.generate_cli(parent, data, template))
+
+    def generate_cli(self, parent, data, template):
+        """
+        Generate the cli body based on schema in dfs order: a group, its commands, then its groups.
+        An explicit stack is used so deep schemas do not hit the recursion limit.
+        :param parent: parent command / group name
+        :param data: tuple of ir.CommandNode
+        :param template: command / group body template
+        :return: iterator of text chunks
+        """
+        for key, parent, node in self.walk_nodes(parent, data):
+            yield from template.generate(**self.get_template_params(parent, node))
+
+    def walk_nodes(self, parent, data):
+        """
+        :param parent: parent command / group name
+        :param data: tuple of ir.CommandNode
+        :return: iterator of (path of names, parent name, ir.CommandNode) in dfs order
+        """
+        # stack of (path of parent, parent name, iterator of remaining siblings)
+        stack = [("", parent, iter(data))]
+        while stack:
+            path, parent, siblings = stack[-1]
+            node = next(siblings, None)
+            if node is None:
+                stack.pop()
+                continue
+
+            key = path + "/" + node.name
+            yield key, parent, node
+
+            # dfs to next groups after next commands
+            if node.groups:
+                stack.append((key, node.name, iter(node.groups)))
+            if node.commands:
+                stack.append((key, node.name, iter(node.commands)))
+
+    def generate_cli_incremental(self, env, schema, root_name):
+        """
+        Same cli file as generate_cli_from_data, commands / groups which did not change since the
+        last update are taken from the project state instead of being rendered again
+        :param env: template engine environment
+        :param schema: schema data
+        :return: generated cli file, cli file path
+        """
+        cli_template = env.get_template('cli_body.txt')
+        last_chunks = self.read_state(self.chunks_path).get("chunks", {})
+        chunks = {}
+        parts = [env.get_template("cli_start.txt").render()]
+
+        # same order as walk_nodes, on the schema data so unchanged nodes are never converted
+        stack = [("", None, iter(schema))]
+        while stack:
+            path, parent, siblings = stack[-1]
+            group = next(siblings, None)
+            if group is None:
+                stack.pop()
+                continue
+
+            key = path + "/" + group["name"]
+            # a node is rendered from its own fields and its parent name only
+            own_fields = [parent, group["name"], group["help"], group["hidden"], group.get("params", []),
+                          "groups" in group, self.templates_hash]
+            node_hash = hashlib.sha1(json.dumps(own_fields, sort_keys=True).encode("utf-8")).hexdigest()
+            chunk = last_chunks.get(key)
+            if chunk is None or chunk[0] != node_hash:
+                node = ir.shallow_from_schema(group)
+                chunk = [node_hash, cli_template.render(**self.get_template_params(parent, node))]
+                self.rendered += 1
+            chunks[key] = chunk
+            parts.append(chunk[1])
+
+            if group.get("groups"):
+                stack.append((key, group["name"], iter(group["groups"])))
+            if group.get("commands"):
+                stack.append((key, group["name"], iter(group["commands"])))
+        parts.append(env.get_template("cli_end.txt").render(root=root_name))
+
+        self.chunks = {"version": PROJECT_STATE_VERSION, "chunks": chunks}
+        return "".join(parts), self.project_path + '/' + self.project_name + 'cli.py'
+
+    def read_state(self, state_path):
+        """
+        :param state_path: state file of the project
+        :return: dict, only the version if the file is missing or outdated
+        """
+        try:
+            with open(state_path) as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            state = None
+        if not isinstance(state, dict) or state.get("version") != PROJECT_STATE_VERSION:
+            state = {"version": PROJECT_STATE_VERSION}
+        return state
+
+    def write_state(self, state_path, state):
+        write_file(json.dumps(state), state_path, replace=True)
+
+    def get_schema_hash(self, schema, include_template=False):
+        # the same schema is hashed by is_up_to_date and update_files
+        if self.schema_hash is None or self.schema_hash[:2] != (id(schema), bool(include_template)):
+            data = json.dumps([schema, bool(include_template), self.templates_hash], sort_keys=True).encode("utf-8")
+            self.schema_hash = (id(schema), bool(include_template), hashlib.sha1(data).hexdigest())
+        return self.schema_hash[2]
+
+    def is_up_to_date(self, schema, include_template=False):
+        """
+        :param schema: schema data
+        :param include_template: schema templates are part of the project
+        :return: True if the project was last updated from the same schema and all its files still exist
+        """
+        return self.state.get("schema") == self.get_schema_hash(schema, include_template) and \
+            all(os.path.exists(path) for path in self.state.get("files", {}))
 
-        output = ""
-
-        for group in data:
-
-            # parse parameters to template writable string
-            group_param_query = ['name', 'help', 'hidden']
-            parsed_group_param = {key: group[key] for key in group_param_query}
-
-            convertor = DataTypeConvertor()
-
-            parsed_group_param = convertor.convert_all(parsed_group_param)
-
-            option_params = group['params'] if "params" in group.keys() else []
-
-            # make sure the parameter is option and process the name as special case
-            parsed_option_param = []
-            for option_param in option_params:
-                if option_param['param_type'] != 'option':
-                    continue
-                del option_param['param_type']
-
-                # process the name field since the code needs to be --<name> instead of name = <name>
-                tmp = convertor.convert_all(option_param)
-                tmp["argument"] = tmp["name"][1:-1]
-                tmp['name'] = "\"" + "--" + tmp['name'][1:]
-                parsed_option_param.append(tmp)
-
-            # construct a list for writing template
-            group_param = [Data(k, v) for (k, v) in parsed_group_param.items()]
-
-            # process name specifically since name must be at first place in code
-            option_param = []
-            for option in parsed_option_param:
-                tmp = []
-                for key in option:
-                    if key == "name":
-                        tmp.insert(0, Data(key, option[key]))
-                    else:
-                        tmp.append(Data(key, option[key]))
-                option_param.append(tmp)
-
-            # use groups to identify if this is a group or command schema
-            click_type = "group" if "groups" in group else "command"
-            output += template.render(click_type=click_type,
-                                      parent_name=parent if parent else "click",
-                                      group_param=group_param,
-                                      group_name=group['name'],
-                                      options_param=option_param
-                                      )
-            # dfs to next commands
-            if "commands" in group:
-                next_output = self.parse_cli(group['name'],
-                                             group['commands'],
-                                             template)
-                output += next_output
-
-            # dfs to next groups
-            if "groups" in group:
-                next_output = self.parse_cli(group['name'],
-                                             group['groups'],
-                                             template)
-                output += next_output
-
-        return output
+    def update_files(self, output, path, schema, include_template=False):
+        """
+        Write files whose content changed and save the project state
+        :param output: list of file contents
+        :param path: list of file paths
+        :param schema: schema data the files were generated from
+        :param include_template: schema templates are part of the project
+        :return: list of written file paths
+        """
+        written = []
+        files = {}
+        for content, file in zip(output, path):
+            data = content.encode("utf-8")
+            content_hash = hashlib.sha1(data).hexdigest()
+            files[file] = content_hash
+            try:
+                with open(file, "rb") as f:
+                    if hashlib.sha1(f.read()).hexdigest() == content_hash:
+                        continue
+            except OSError:
+                pass
+            write_file(content, file, replace=True)
+            written.append(file)
+
+        self.state["schema"] = self.get_schema_hash(schema, include_template)
+        self.state["files"] = files
+        if self.chunks is not None:
+            self.write_state(self.chunks_path, self.chunks)
+        self.write_state(self.state_path, self.state)
+        return written
+
+    def get_template_params(self, parent, node):
+        """
+        :param parent: parent command / group name
+        :param node: ir.CommandNode of current command / group
+        :return: arguments of command / group body template
+        """
+        # parse parameters to template writable string
+        group_values = {"name": node.name, "help": node.help, "hidden": node.hidden}
+        group_param = [Data(k, v) for (k, v) in self.convertor.convert_all(group_values).items()]
+
+        # make sure the parameter is option and process the name as special case
+        option_param = []
+        for param in node.params:
+            if param.param_type != 'option':
+                continue
+            option = self.convertor.convert_all({key: value for key, value in zip(ir.ParamNode._fields, param)
+                                                 if value is not None and key != 'param_type'})
+
+            # process the name field since the code needs to be --<name> instead of name = <name>
+            # name must be at first place in code
+            option_param.append([Data("name", "\"" + "--" + option['name'][1:])] +
+                                [Data(k, v) for (k, v) in option.items() if k != "name"] +
+                                [Data("argument", option["name"][1:-1])])
+
+        # use groups to identify if this is a group or command schema
+        click_type = "group" if node.groups is not None else "command"
+        return {"click_type": click_type,
+                "parent_name": parent if parent else "click",
+                "group_param": group_param,
+                "group_name": node.name,
+                "options_param": option_param}
 
     def append_schema_template(self, env, output, path):
         schema_json_output = env.get_template('schema_json.txt').render()
@@ -166,26 +319,250 @@ class ProjectGenerator:
 
         return output, path
 
-    def write_files(self, output, path):
+    def write_files(self, output, path, strict=False, fsync=False, workers=WRITE_WORKERS):
+        """
+        Write all files into a staging folder next to the project and move it into place,
+        an existing project is only replaced after every file was written
+        :param output: list of file contents, each a string or an iterator of text chunks
+        :param path: list of file paths in the project folder
+        :param strict: raise the error after removing the staging folder instead of printing it
+        :param fsync: flush files and folders to disk before the project is moved into place
+        :param workers: number of threads writing files
+        """
+        staging_path = self.get_sibling_path("tmp")
         try:
-            for output, file in zip(output, path):
-                with open(file, 'w') as f:
-                    f.write(output)
+            os.mkdir(staging_path)
+            jobs = [(content, os.path.join(staging_path, os.path.relpath(file, self.project_path)))
+                    for content, file in zip(output, path)]
+            if workers > 1 and len(jobs) > 1:
+                from concurrent.futures import ThreadPoolExecutor
+
+                with ThreadPoolExecutor(max_workers=min(workers, len(jobs))) as executor:
+                    # list to raise the first error
+                    list(executor.map(lambda job: write_file(*job), jobs))
+            else:
+                for job in jobs:
+                    write_file(*job)
+
+            # flush in one pass after all files are written instead of blocking every write on the disk
+            if fsync:
+                fsync_tree(staging_path)
+            self.replace_project(staging_path)
+            if fsync:
+                fsync_folder(os.path.dirname(os.path.abspath(self.project_path)))
         except Exception as e:
+            if os.path.exists(staging_path):
+                shutil.rmtree(staging_path, ignore_errors=True)
+            if strict:
+                raise
             print(e)
-            if os.path.exists(self.project_path):
-                self.clean_project()
-                print("cleaned project")
-
+            print("project is not changed")
 
-class Data:
+    def get_sibling_path(self, kind):
+        """
+        :param kind: tmp / old
+        :return: unique hidden folder path next to the project folder
+        """
+        folder, name = os.path.split(os.path.abspath(self.project_path))
+        return os.path.join(folder, ".{}.{}-{}".format(name, kind, uuid.uuid4().hex[:12]))
 
-    def __init__(self, name, val):
+    def replace_project(self, staging_path):
         """
-        This class is used to load data when writing template
+        Rename the staging folder to the project folder, an existing project is renamed to a backup first
+        and removed after the new project is in place
+        :param staging_path: folder of the written project
         """
-        self.name = name
-        self.val = val
+        if not os.path.exists(self.project_path):
+            os.rename(staging_path, self.project_path)
+            return
+
+        backup_path = self.get_sibling_path("old")
+        os.rename(self.project_path, backup_path)
+        try:
+            os.rename(staging_path, self.project_path)
+        except OSError:
+            os.rename(backup_path, self.project_path)
+            raise
+        shutil.rmtree(backup_path, ignore_errors=True)
+
+
+def write_file(content, file, replace=False):
+    """
+    :param content: string or iterator of text chunks
+    :param file: file path, missing folders are created
+    :param replace: write a temporary file and rename it, readers never see a partly written file
+    """
+    os.makedirs(os.path.dirname(file), exist_ok=True)
+    target = file + ".tmp-" + str(os.getpid()) if replace else file
+    with open(target, 'w', encoding="utf-8") as f:
+        if isinstance(content, str):
+            f.write(content)
+        else:
+            f.writelines(content)
+    if replace:
+        os.replace(target, file)
+
+
+def fsync_folder(path):
+    """
+    :param path: folder whose entries (created / renamed files) are flushed to disk
+    """
+    # folders can not be opened for fsync on windows
+    if os.name == "nt":
+        return
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def fsync_tree(path):
+    """
+    :param path: folder whose files and sub folders are flushed to disk
+    """
+    for folder, _, files in os.walk(path):
+        for name in files:
+            fd = os.open(os.path.join(folder, name), os.O_RDWR)
+            try:
+                os.fsync(fd)
+            finally:
+                os.close(fd)
+        fsync_folder(folder)
+
+
+def get_template_cache_dir():
+    """
+    :return: folder of compiled templates, METACLI_TEMPLATE_CACHE if set
+    """
+    return os.environ.get(TEMPLATE_CACHE_ENV) or os.path.join(os.path.expanduser("~"), ".metacli_cache", "templates")
+
+
+def get_template_env(template_dirs=()):
+    """
+    Template engine environment, created once per process for each list of template folders.
+    Compiled templates are kept in memory by the environment and on disk in the bytecode cache,
+    the cache is keyed by template name and source checksum so changed templates are compiled again
+    :param template_dirs: user template folders, their templates override built-in templates of the same name
+    :return: jinja2.Environment
+    """
+    template_dirs = tuple(os.path.abspath(template_dir) for template_dir in template_dirs)
+    env = _template_envs.get(template_dirs)
+    if env is not None:
+        return env
+
+    import jinja2
+
+    loaders = [jinja2.FileSystemLoader(searchpath=template_dir) for template_dir in template_dirs]
+    loaders.append(jinja2.FileSystemLoader(searchpath=TEMPLATE_DIR))
+    bytecode_cache = None
+    try:
+        os.makedirs(get_template_cache_dir(), exist_ok=True)
+        bytecode_cache = jinja2.FileSystemBytecodeCache(get_template_cache_dir())
+    except OSError:
+        # compile in memory only if the cache folder can not be created
+        pass
+
+    env = jinja2.Environment(loader=jinja2.ChoiceLoader(loaders), bytecode_cache=bytecode_cache)
+    return _template_envs.setdefault(template_dirs, env)
+
+
+def get_templates_hash(env, template_dirs=()):
+    """
+    :param env: environment from get_template_env
+    :param template_dirs: user template folders of the environment
+    :return: checksum of the template folders and the source of every template the environment loads
+    """
+    digest = hashlib.sha1(json.dumps([os.path.abspath(template_dir) for template_dir in template_dirs])
+                          .encode("utf-8"))
+    for name in sorted(env.list_templates()):
+        source = env.loader.get_source(env, name)[0]
+        digest.update(json.dumps([name, source]).encode("utf-8"))
+    return digest.hexdigest()
+
+
+def precompile_templates(template_dirs=()):
+    """
+    Compile all templates into the bytecode cache, e.g. after installing metacli
+    :param template_dirs: user template folders
+    :return: sorted list of template names
+    """
+    env = get_template_env(template_dirs)
+    names = sorted(env.list_templates())
+    for name in names:
+        env.get_template(name)
+    return names
+
+
+def load_schema(fromjson, fromyaml):
+    """
+    :param fromjson: schema json path, "" if not given
+    :param fromyaml: schema yaml path, "" if not given
+    :return: validated schema data
+    """
+    validator = SchemaValidator()
+
+    if fromjson != "":
+        with open(fromjson) as json_file:
+            schema = json.load(json_file)
+    else:
+        import yaml
+
+        with open(fromyaml) as yaml_file:
+            schema = yaml.load(yaml_file, yaml.FullLoader)
+    validator.validate_json(schema)
+    return schema
+
+
+def generate_project(project_path, project_name, schema=None, include_template=False, overwrite=None, strict=False,
+                     template_dirs=()):
+    """
+    Generate a new command line project
+    :param project_path: project folder
+    :param project_name: project name
+    :param schema: validated schema data, None for a hello world project
+    :param include_template: add schema.json & schema.yaml templates
+    :param overwrite: replace an existing project folder, None to ask
+    :param strict: raise write errors instead of printing them
+    :param template_dirs: user template folders overriding built-in templates
+    :return: list of file paths
+    """
+    generator = ProjectGenerator(project_path, project_name, overwrite=overwrite)
+    env = get_template_env(template_dirs)
+
+    if schema is None:
+        # initial hello world project with cli.py, setup.py, init.py, plugin_commands.json
+        templates_name = ['__init__.txt', 'setup.txt', 'cli.txt', 'plugin_commands.txt']
+        templates = [env.get_template(name) for name in templates_name]
+        names = ['__init__.py', 'setup.py', project_name + 'cli.py', 'plugin_commands.json']
+        output, path = generator.create_empty_files(templates, names, project_name)
+
+    else:
+        # generate cli file from data (only support one root now)
+        root_name = schema[0]['name']
+        cli_output, cli_path = generator.generate_cli_from_data(env, schema, root_name)
+
+        # generate setup.py, plugin_commands.json, __init__.py
+        templates_name = ['__init__.txt', 'setup.txt', 'plugin_commands.txt']
+        templates = [env.get_template(name) for name in templates_name]
+        names = ['__init__.py', 'setup.py', 'plugin_commands.json']
+        output, path = generator.create_empty_files(templates, names, root_name)
+
+        # add cli.py to output
+        output.append(cli_output)
+        path.append(cli_path)
+
+    # add schema.json & schema.yaml
+    if include_template:
+        output, path = generator.append_schema_template(env, output, path)
+
+    # output all files
+    generator.write_files(output, path, strict=strict)
+    return path
+
+
+# field name and template writable value, used to load data when writing template
+Data = collections.namedtuple("Data", ["name", "val"])
 
 
 class DataTypeConvertor:
@@ -219,25 +596,27 @@ class DataTypeConvertor:
 
     def convert_all(self, data_list):
         """
-        :param data_list: the dict as {field_name : field argument}
+        :param data_list: the dict as {field_name : field argument}, not modified
         :return: the dict as {field_name: field argument which is good for writing template}
         """
-        old = data_list
         new = {}
+        skipped = set()
 
         # If the type is already defined, use the data type instead of default mapping between data type
-        if 'type' in old.keys():
-            if old['default'] != 'None':
-                new['default'] = self.convert(old['default'], old['type'])
-                del old['default']
-            del old['type']
+        if 'type' in data_list:
+            skipped.add('type')
+            if data_list['default'] != 'None':
+                new['default'] = self.convert(data_list['default'], data_list['type'])
+                skipped.add('default')
 
         # convert all data type into writable type in template
-        for key in old.keys():
-            if old[key] == 'None':
-                new[key] = self.convert(old[key], 'None')
+        for key, value in data_list.items():
+            if key in skipped:
+                continue
+            if value == 'None':
+                new[key] = self.convert(value, 'None')
             else:
-                new[key] = self.convert(old[key], key)
+                new[key] = self.convert(value, key)
 
         return new
 
@@ -330,11 +709,13 @@ class SchemaValidator:
     def validate_json(self, data):
         if "groups" not in data:
             self.schema["items"] = {"$ref": "#/definitions/command"}
+        from jsonschema import validate
         validate(instance=data, schema=self.schema)
 
     def validate_yaml(self, data):
         if "groups" not in data:
             self.schema["items"] = {"$ref": "#/definitions/command"}
+        from jsonschema import validate
         validate(instance=data, schema=self.schema)
 
 
@@ -367,47 +748,11 @@ class SchemaInfoGenerator:
         :param info: click.Group object
         :return: dict of group info
         """
-        group = info.__dict__
-
-        group_info = {"name": group['name'],
-                      "help": str(group["help"]),
-                      "hidden": str(group['hidden']),
-                      "groups": [],
-                      "commands": [],
-                      "params": self.get_param_info(info)}
-
-        for obj in group['commands'].values():
-            if isinstance(obj, click.Group):
-                group_info["groups"].append(self.get_help_info_dfs(obj))
-
-            elif isinstance(obj, click.Command):
-                command_info = obj.__dict__
-                cmd = {"name": command_info['name'],
-                       "help": str(command_info['help']),
-                       "hidden": str(command_info['hidden']),
-                       "params": self.get_param_info(obj)}
-                group_info["commands"].append(cmd)
-
-        return group_info
+        return ir.to_schema(ir.from_click(info))
 
     def get_param_info(self, info):
         """
         :param info: click.command or click.Object Object
         :return: dict of param info
         """
-        params = info.__dict__['params']
-
-        info_query_option = ['name', 'help', 'type', 'default', 'required', 'prompt']
-        info_query_argument = ['name', 'type', 'default', 'required']
-        params_info = []
-
-        for param in params:
-            if isinstance(param, click.Option):
-                param_info = {key: str(param.__dict__[key]) for key in info_query_option}
-                param_info['param_type'] = 'option'
-            if isinstance(param, click.Argument):
-                param_info = {key: str(param.__dict__[key]) for key in info_query_argument}
-                param_info['param_type'] = 'argument'
-            params_info.append(param_info)
-
-        return params_info
+        return [ir.param_to_dict(ir.param_from_click(param)) for param in info.params]
@@ -4,6 +4,8 @@ import json
 import pickle
 import os
 import sys
+from .plugin import resolve_lazy
+from .util import LayeredContextObj
 
 
 class MainShell(cmd.Cmd):
@@ -236,7 +238,7 @@ class Shell(MainShell):
         ''' Set context object to save parameter value'''
 
         if context.obj is None:
-            context.obj = {}
+            context.obj = LayeredContextObj(names=[context.command.name])
 
         if self.shell_group_saved_parameters is None:
             self.shell_group_saved_parameters = {}
@@ -354,12 +356,15 @@ class Shell(MainShell):
                         self.shell_group_saved_parameters[param_name].append(ctx_obj[param_name])
 
     def set_and_pass_context_obj(self, nested_shell_context):
-        # set the context of nested shell for click group found
-        self.set_context_obj(nested_shell_context)
+        # nested shell reads the context obj of current shell through its own layer instead of a copy
+        if isinstance(self.ctx.obj, LayeredContextObj):
+            parent_obj = self.ctx.obj
+        else:
+            parent_obj = LayeredContextObj(self.ctx.obj or {}, names=[self.ctx.command.name])
+        nested_shell_context.obj = parent_obj.new_child(name=nested_shell_context.command.name)
 
-        # transfer the param and value in context obj of current shell to the nested shell
-        for param, value in self.ctx.obj.items():
-            nested_shell_context.obj[param] = value
+        # set the context of nested shell for click group found, its values hide the values of current shell
+        self.set_context_obj(nested_shell_context)
 
     def parse_parameters_and_update_dictionary(self, ctx, args, command, bool_type):
         """
@@ -519,6 +524,7 @@ class Shell(MainShell):
         command = self.ctx.command.commands.get(command_input)
 
         if command:
+            command = resolve_lazy(command)
 
             create_shell = False
             arg_type = ""
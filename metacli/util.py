@@ -1,30 +1,79 @@
-import json
-import jsonschema
+import collections
 import os
-import logging
+import sys
 
 
 def check_valid_json(json_path):
-    # the kind of json we expect in plugins_commands.json
-    schema = {
-        "type": "object",
-        "properties": {
-            "name": {"type": "string"},
-            "click_root": {"type": "string"},
-            "file_path": {"type": "string"},
-            "package_path": {"type": "string"},
-            "package_name": {"type": "string"}
-        }
-    }
-    with open(json_path) as f:
-        try:
-            command_data = json.load(f)
-            # validate given json is same as what is described in schema
-            jsonschema.validate(command_data, schema)
-        except jsonschema.exceptions.ValidationError as e:
-            print("invalid json", e)
-        except json.decoder.JSONDecodeError as e:
-            print("text is not json", e)
+    """
+    Print problems of a plugin json, the file is parsed once per process by the manifest registry
+    :param json_path: plugin json path
+    """
+    from .manifest import manifests
+
+    manifests.check(json_path)
+
+
+# folders and files not shown in project trees
+TREE_IGNORE = (".git", ".hg", ".svn", ".tox", ".venv", "venv", "node_modules", "__pycache__", ".metacli_cache", "*.pyc")
+TREE_BUFFER_LINES = 512
+
+
+def render_tree(startpath, out=None, max_depth=None, ignore=TREE_IGNORE, max_entries=None):
+    """
+    Write files structure based on startpath, files of a folder come before its subfolders
+    :param startpath: path
+    :param out: text stream, default stdout, written every TREE_BUFFER_LINES lines
+    :param max_depth: number of folder levels shown below startpath, None for all
+    :param ignore: glob patterns of folder and file names not shown
+    :param max_entries: number of entries shown per folder, None for all
+    :return: number of lines written
+    """
+    import fnmatch
+    import re
+
+    out = sys.stdout if out is None else out
+    ignored = re.compile("|".join(fnmatch.translate(pattern) for pattern in ignore)) if ignore else None
+
+    lines = []
+    written = 0
+    folders_to_walk = [(startpath, 0)]
+    while folders_to_walk:
+        path, level = folders_to_walk.pop()
+        lines.append('{}{}/'.format(' ' * 4 * level, os.path.basename(path)))
+
+        subfolders = []
+        if max_depth is None or level < max_depth:
+            files = []
+            try:
+                with os.scandir(path) as entries:
+                    for entry in entries:
+                        if ignored is not None and ignored.match(entry.name):
+                            continue
+                        (subfolders if entry.is_dir(follow_symlinks=False) else files).append(entry.name)
+            except OSError:
+                pass
+            files.sort()
+            subfolders.sort()
+
+            hidden = 0
+            if max_entries is not None and len(files) + len(subfolders) > max_entries:
+                hidden = len(files) + len(subfolders) - max_entries
+                files = files[:max_entries]
+                subfolders = subfolders[:max_entries - len(files)]
+
+            subindent = ' ' * 4 * (level + 1)
+            lines.extend(subindent + name for name in files)
+            if hidden:
+                lines.append('{}... {} more'.format(subindent, hidden))
+
+        folders_to_walk.extend((os.path.join(path, name), level + 1) for name in reversed(subfolders))
+
+        if len(lines) >= TREE_BUFFER_LINES or not folders_to_walk:
+            out.write("\n".join(lines) + "\n")
+            written += len(lines)
+            lines = []
+
+    return written
 
 
 def list_files(startpath):
@@ -32,34 +81,68 @@ def list_files(startpath):
     Show files structure based on startpath in console
     :param startpath: path
     """
-    for root, dirs, files in os.walk(startpath):
-        level = root.replace(startpath, '').count(os.sep)
-        indent = ' ' * 4 * level
-        print('{}{}/'.format(indent, os.path.basename(root)))
-        subindent = ' ' * 4 * (level + 1)
-        for f in files:
-            print('{}{}'.format(subindent, f))
+    render_tree(startpath)
 
 
 # Get logger to write to log file.
-# It has to be initialized every-time, since in a commandline application.
-# the process is short-lived and new process is created for every invocation of a command.
-def get_logger(logger_name):
+# It is called for every invocation of a command, the handler of a log file is created once per process
+# and writes in a background thread, so logging does not wait for the disk.
+def get_logger(logger_name, **kwargs):
+    """
+    :param logger_name: name of logger, records are written to <logger_name>.log in current folder
+    :param kwargs: max_bytes / backup_count / rotate_seconds of the log file
+    :return: logger
+    """
+    import logging
+    from .log import get_log_handler
 
     # default name and logger
     logger = logging.getLogger(str(logger_name))
     logger.setLevel(logging.DEBUG)
-    file_name = str(logger_name) + ".log"
-    fh = logging.FileHandler(file_name)
-    formatter = logging.Formatter('[%(asctime)s] p%(process)s {%(filename)s:%(lineno)d} %(levelname)s - %(message)s',
-                                  '%Y-%m-%d %H:%M:%S')
-    fh.setFormatter(formatter)
-    logger.handlers.clear()
-    logger.addHandler(fh)
+    handler = get_log_handler(str(logger_name) + ".log", **kwargs)
+    if logger.handlers != [handler]:
+        logger.handlers.clear()
+        logger.addHandler(handler)
 
     return logger
 
 
+class LayeredContextObj(collections.ChainMap):
+
+    def __init__(self, *maps, names=None):
+        """
+        Context object of nested commands. Each command writes into its own layer and reads through
+        to the layers of its parents, so a value of a child hides the value of its parent.
+        A new layer shares the parent layers instead of copying them.
+        :param maps: layers, innermost first
+        :param names: name of the command owning each layer
+        """
+        collections.ChainMap.__init__(self, *maps)
+        self.names = list(names) if names is not None else [None] * len(self.maps)
+
+    def new_child(self, m=None, name=None):
+        """
+        :param m: values of the new layer
+        :param name: name of the command owning the new layer
+        :return: LayeredContextObj with the new layer on top of all layers of self
+        """
+        return self.__class__({} if m is None else m, *self.maps, names=[name] + self.names)
+
+    @property
+    def parents(self):
+        return self.__class__(*self.maps[1:], names=self.names[1:])
+
+    def layer_of(self, key):
+        """
+        :param key: attribute in context
+        :return: name of the command which set the visible value
+        """
+        for name, layer in zip(self.names, self.maps):
+            if key in layer:
+                return name
+        raise KeyError(key)
+
+
 # Set context object for an object
 def set_context_obj(ctx, my_ctx_obj={}):
     """
@@ -68,10 +151,21 @@ def set_context_obj(ctx, my_ctx_obj={}):
     :param my_ctx_obj: specified attributes for context
     :return:
     """
+    parent_obj = ctx.parent.obj if ctx.parent is not None else None
     if ctx.obj is None:
-        ctx.obj = {}
+        ctx.obj = LayeredContextObj(names=[ctx.command.name])
+    elif not isinstance(ctx.obj, LayeredContextObj):
+        # obj passed by the caller becomes the outermost layer
+        ctx.obj = LayeredContextObj({}, ctx.obj, names=[ctx.command.name, None])
+    elif ctx.obj is parent_obj:
+        ctx.obj = ctx.obj.new_child(name=ctx.command.name)
 
-    # Add attributes to context
-    # Allow overwrite of saved attributes (child overwrites parent) relevant for context
+    # Attributes new to the context are also added to the shared outermost layer, so parent plugins see them
+    shared = ctx.obj.maps[-1]
     for state, value in my_ctx_obj.items():
-        ctx.obj[state] = value
+        if state not in ctx.obj:
+            shared[state] = value
+
+    # Add attributes to own layer of context
+    # Allow overwrite of saved attributes (child overwrites parent) relevant for context
+    ctx.obj.maps[0].update(my_ctx_obj)
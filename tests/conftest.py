@@ -14,3 +14,11 @@ def root():
         pass
 
     return root_plugin
+
+
+@pytest.fixture(scope="session", autouse=True)
+def template_cache(tmp_path_factory):
+    # compiled templates of the tests are not written to the cache in the home folder
+    with pytest.MonkeyPatch.context() as patch:
+        patch.setenv("METACLI_TEMPLATE_CACHE", str(tmp_path_factory.mktemp("template_cache")))
+        yield
@@ -0,0 +1,65 @@
+from click.testing import CliRunner
+from metacli import metacli
+import json
+import os
+import pathlib
+import shutil
+import subprocess
+import sys
+import zipfile
+
+
+def test_bundle(tmp_path):
+    # base plugin "sea" with plugin "fish" in a sibling folder
+    (tmp_path / "sea").mkdir()
+    (tmp_path / "fish").mkdir()
+    (tmp_path / "sea" / "seacli.py").write_text('''import click
+from metacli.decorators import loadPlugin
+
+
+@loadPlugin(json_file="plugin_commands.json", base_path=__file__)
+@click.group()
+def sea():
+    """Sea"""
+    pass
+''')
+    (tmp_path / "sea" / "plugin_commands.json").write_text(json.dumps(
+        {"modules": [{"name": "fish", "click_root": "fish", "package_path": "../fish/", "package_name": "fishcli"}]}))
+    (tmp_path / "fish" / "fishcli.py").write_text('''import click
+from fishhelper import SOUND
+
+
+@click.group()
+def fish():
+    """Fish"""
+    pass
+
+
+@fish.command("swim")
+def swim():
+    click.echo(SOUND)
+''')
+    (tmp_path / "fish" / "fishhelper.py").write_text('SOUND = "blub"\n')
+    # environments and build output next to the plugin are not packed
+    for folder in ("venv", "build", "env"):
+        (tmp_path / "fish" / folder / "lib").mkdir(parents=True)
+        (tmp_path / "fish" / folder / "lib" / "installed.py").write_text("")
+    (tmp_path / "fish" / "env" / "pyvenv.cfg").write_text("home = /usr/bin\n")
+
+    archive = str(tmp_path / "sea.pyz")
+    result = CliRunner().invoke(metacli.metacli, ["bundle", "--cli", str(tmp_path / "sea" / "seacli.py"),
+                                                  "--root", "sea", "--output", archive])
+    assert result.exit_code == 0
+
+    names = zipfile.ZipFile(archive).namelist()
+    assert "tree/fish/fishcli.pyc" in names
+    assert "metacli_bundle.json" in names
+    assert not [name for name in names if "installed" in name]
+
+    # run bundle without the plugin folders
+    for folder in ("sea", "fish"):
+        shutil.rmtree(str(tmp_path / folder))
+
+    env = dict(os.environ, PYTHONPATH=str(pathlib.Path(__file__).resolve().parent.parent))
+    output = subprocess.check_output([sys.executable, archive, "fish", "swim"], env=env, cwd=str(tmp_path))
+    assert output.decode().strip() == "blub"
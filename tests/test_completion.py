@@ -0,0 +1,69 @@
+from click.testing import CliRunner
+from metacli.builtin_plugins import completion
+from metacli.completion import CompletionIndex
+import click
+import subprocess
+import sys
+
+
+@click.group()
+def sea():
+    """sea"""
+    pass
+
+
+@sea.group("fish")
+def fish():
+    """fish"""
+    pass
+
+
+@fish.command("swim")
+@click.option("--depth", type=int)
+@click.option("--style", type=click.Choice(["fly", "crawl"]))
+def swim(depth, style):
+    """swim"""
+    pass
+
+
+@fish.command("sink")
+def sink():
+    """sink"""
+    pass
+
+
+@sea.command("secret", hidden=True)
+def secret():
+    pass
+
+
+sea.add_command(completion)
+
+
+def test_completion_index(tmp_path):
+    index_path = str(tmp_path / "sea.json")
+    CompletionIndex.build(sea).save(index_path)
+    index = CompletionIndex.load(index_path)
+
+    assert index.complete([""]) == ["completion", "fish"]
+    assert index.complete(["fi"]) == ["fish"]
+    assert index.complete(["fish", "s"]) == ["sink", "swim"]
+    assert index.complete(["fish", "swim", "--"]) == ["--depth", "--help", "--style"]
+    assert index.complete(["fish", "swim", "--depth", "3", "--st"]) == ["--style"]
+    assert index.complete(["fish", "swim", "--style", ""]) == ["crawl", "fly"]
+    assert CompletionIndex.load(str(tmp_path / "missing.json")).complete(["f"]) == []
+
+    # query used by the shell scripts
+    result = subprocess.run([sys.executable, "-m", "metacli.completion", index_path, "fish", "sw"],
+                            stdout=subprocess.PIPE, universal_newlines=True)
+    assert result.stdout == "swim\n"
+
+
+def test_builtin_completion(tmp_path):
+    index_path = str(tmp_path / "sea.json")
+    result = CliRunner().invoke(sea, ["completion", "bash", "--index", index_path], prog_name="sea")
+
+    assert result.exit_code == 0
+    assert "complete -o default -F _sea_completion sea" in result.output
+    assert index_path in result.output
+    assert CompletionIndex.load(index_path).complete(["fish", "sw"]) == ["swim"]
@@ -0,0 +1,50 @@
+from click.testing import CliRunner
+from metacli.util import LayeredContextObj, set_context_obj
+import click
+
+
+def test_layered_context_obj():
+    seen = {}
+
+    @click.group()
+    @click.pass_context
+    def sea(ctx):
+        set_context_obj(ctx, {"logger": "sea logger", "depth": 1})
+
+    @sea.group("reef")
+    @click.pass_context
+    def reef(ctx):
+        set_context_obj(ctx, {"depth": 2, "current": "east"})
+
+    @reef.command("dive")
+    @click.pass_context
+    def dive(ctx):
+        seen["obj"] = ctx.obj
+        seen["sea"] = ctx.find_root().obj
+
+    result = CliRunner().invoke(sea, ["reef", "dive"])
+    assert result.exit_code == 0
+
+    # child value hides parent value, parent layer is shared and keeps its values
+    obj = seen["obj"]
+    assert obj["depth"] == 2 and obj["logger"] == "sea logger"
+    assert obj.layer_of("depth") == "reef" and obj.layer_of("logger") == "sea"
+    assert obj.layer_of("current") == "reef"
+    # attribute added by the child is visible to the parent
+    assert dict(seen["sea"]) == {"logger": "sea logger", "depth": 1, "current": "east"}
+    assert obj.maps[1] is seen["sea"].maps[0]
+
+
+def test_layered_context_obj_caller_obj():
+    obj = LayeredContextObj({"a": 1}, names=["root"]).new_child({"a": 2}, name="child")
+    assert obj["a"] == 2 and obj.parents["a"] == 1
+    assert obj.parents.layer_of("a") == "root"
+
+    @click.command()
+    @click.pass_context
+    def fish(ctx):
+        set_context_obj(ctx, {"name": "fish"})
+        click.echo(ctx.obj.layer_of("name") + " " + str(ctx.obj.layer_of("owner")))
+
+    result = CliRunner().invoke(fish, obj={"owner": "caller"})
+    assert result.output == "fish None\n"
@@ -0,0 +1,50 @@
+from click.testing import CliRunner
+from metacli.builtin_plugins import last_error
+from metacli.crash import describe_exception, format_crash_record, load_crash_record
+from metacli.decorators import loadLogging
+import click
+import pytest
+import sys
+
+
+def fail_with_large_locals():
+    table = {index: "row" * 100 for index in range(100000)}
+    raise ValueError("bad row")
+
+
+def test_crash_record_is_bounded():
+    with pytest.raises(ValueError) as info:
+        fail_with_large_locals()
+    record = describe_exception(info.value)
+
+    frame = record["frames"][-1]
+    assert frame["function"] == "fail_with_large_locals"
+    assert len(frame["locals"]["table"]) < 1000
+    assert "-->" in format_crash_record(record)
+    assert "ValueError: bad row" in format_crash_record(record)
+
+
+def test_last_error(tmp_path, monkeypatch):
+    monkeypatch.setenv("HOME", str(tmp_path))
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(sys, "argv", ["ocean", "sink"])
+
+    @click.group()
+    def ocean():
+        pass
+
+    @ocean.command("sink")
+    def sink():
+        depth = 42
+        raise RuntimeError("too deep")
+
+    ocean.add_command(last_error)
+
+    # failing command only stores a compact record
+    with pytest.raises(SystemExit):
+        loadLogging(ocean, logger_name="ocean")
+    assert load_crash_record("ocean")["type"] == "RuntimeError"
+
+    result = CliRunner().invoke(ocean, ["last-error"])
+    assert "depth = 42" in result.output
+    assert "RuntimeError: too deep" in result.output
@@ -0,0 +1,51 @@
+from metacli.daemon import run_client
+import os
+import pathlib
+import subprocess
+import sys
+import time
+
+SERVER = '''
+import click
+import sys
+from metacli.daemon import DaemonServer
+
+
+@click.group()
+def sea():
+    pass
+
+
+@sea.command("swim")
+@click.option("--name", default="fish")
+def swim(name):
+    click.echo(name + " is swimming in " + __import__("os").getcwd())
+
+
+@sea.command("sink")
+def sink():
+    sys.exit(3)
+
+
+DaemonServer(sea, sys.argv[1]).serve_forever()
+'''
+
+
+def test_daemon(tmp_path, capfd, monkeypatch):
+    socket_path = str(tmp_path / "sea.sock")
+    env = dict(os.environ, PYTHONPATH=str(pathlib.Path(__file__).resolve().parent.parent))
+    server = subprocess.Popen([sys.executable, "-c", SERVER, socket_path], env=env)
+    try:
+        for i in range(100):
+            if os.path.exists(socket_path):
+                break
+            time.sleep(0.05)
+
+        # output and exit code of forked child come back to client
+        monkeypatch.chdir(str(tmp_path))
+        assert run_client(socket_path, ["sea", "swim", "--name", "shark"]) == 0
+        assert run_client(socket_path, ["sea", "sink"]) == 3
+        assert "shark is swimming in " + str(tmp_path) in capfd.readouterr().out
+    finally:
+        server.terminate()
+        server.wait()
@@ -0,0 +1,40 @@
+import os
+import pathlib
+import subprocess
+import sys
+
+# cumulative import time of metacli.decorators as a multiple of click's own import time, both measured
+# in the same run with python -X importtime so machine speed and load cancel out
+IMPORT_BUDGET_FACTOR = 3
+
+# only loaded when the feature using them runs
+HEAVY_MODULES = ("jsonschema", "jinja2", "yaml", "stackprinter", "pickle", "concurrent.futures", "logging",
+                 "importlib.abc", "metacli.shell", "metacli.schema")
+
+
+def run_python(*args):
+    env = dict(os.environ, PYTHONPATH=str(pathlib.Path(__file__).resolve().parent.parent))
+    return subprocess.run([sys.executable] + list(args), env=env, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                          universal_newlines=True, check=True)
+
+
+def import_time_ms(module):
+    result = run_python("-X", "importtime", "-c", "import " + module)
+    for line in result.stderr.splitlines():
+        fields = line.split("|")
+        if len(fields) == 3 and fields[2].strip() == module:
+            return int(fields[1]) / 1000
+    raise AssertionError("no import time reported for " + module)
+
+
+def test_decorators_import_time():
+    # best of several runs, a busy machine only makes single runs slower
+    click_ms = min(import_time_ms("click") for _ in range(5))
+    decorators_ms = min(import_time_ms("metacli.decorators") for _ in range(5))
+    assert decorators_ms < click_ms * IMPORT_BUDGET_FACTOR
+
+
+def test_decorators_import_no_heavy_modules():
+    result = run_python("-c", "import metacli.decorators, sys\n"
+                              "print(' '.join(name for name in {!r} if name in sys.modules))".format(HEAVY_MODULES))
+    assert result.stdout.split() == []
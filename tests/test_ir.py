@@ -0,0 +1,50 @@
+from metacli import ir
+from metacli.schema import ProjectGenerator
+import jinja2
+import json
+import time
+
+
+def make_schema(groups, commands_per_group):
+    option = {"name": "name", "help": "input your name", "type": "STRING", "default": "fish",
+              "required": "False", "prompt": "None", "param_type": "option"}
+    return [{"name": "sea", "help": "sea", "hidden": "False", "params": [], "commands": [],
+             "groups": [{"name": "group" + str(group), "help": "group", "hidden": "False", "params": [dict(option)],
+                         "groups": [],
+                         "commands": [{"name": "cmd" + str(command), "help": "cmd", "hidden": "False",
+                                       "params": [dict(option)]}
+                                      for command in range(commands_per_group)]}
+                        for group in range(groups)]}]
+
+
+def test_ir_round_trip():
+    schema = make_schema(3, 2)
+    text = json.dumps(schema)
+    nodes = ir.from_schema(schema)
+
+    # schema is not modified and can be rebuilt from the ir
+    assert json.dumps(schema) == text
+    assert [ir.to_schema(node) for node in nodes] == schema
+    assert nodes[0].groups[1].commands[0].params[0].default == "fish"
+
+
+def test_ir_50k_commands(tmp_path):
+    schema = make_schema(500, 100)
+    text = json.dumps(schema)
+
+    start = time.perf_counter()
+    nodes = ir.from_schema(schema)
+    build_time = time.perf_counter() - start
+
+    generator = ProjectGenerator(str(tmp_path / "big"), "big")
+    env = jinja2.Environment(loader=jinja2.PackageLoader("metacli", "templates"))
+    start = time.perf_counter()
+    cli_output, cli_path = generator.generate_cli_from_data(env, nodes, "sea")
+    generator.write_files([cli_output], [cli_path])
+    generate_time = time.perf_counter() - start
+
+    assert json.dumps(schema) == text
+    with open(cli_path) as f:
+        assert sum(1 for line in f if line.startswith("def cmd")) == 50000
+    assert build_time < 5
+    assert generate_time < 30
@@ -0,0 +1,67 @@
+from metacli.log import RotatingBatchFileHandler
+from metacli.util import get_logger
+import logging
+import os
+import pathlib
+import re
+import subprocess
+import sys
+
+WRITER = '''
+from metacli.util import get_logger
+import sys
+
+logger = get_logger("shared", max_bytes=4096, backup_count=50)
+for index in range(300):
+    logger.info("writer %s line %s", sys.argv[1], index)
+'''
+
+
+def read_lines(path):
+    lines = []
+    for log_file in sorted(path.glob("shared.log*")):
+        lines.extend(log_file.read_text().splitlines())
+    return lines
+
+
+def test_logger_handler_reuse(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    logger = get_logger("reuse")
+    handler = logger.handlers[0]
+
+    # handler of the same log file is kept across calls
+    assert get_logger("reuse").handlers == [handler]
+    assert handler.baseFilename == str(tmp_path / "reuse.log")
+
+    logger.debug("first message")
+    handler.flush()
+    assert "DEBUG - first message" in (tmp_path / "reuse.log").read_text()
+    handler.close()
+
+
+def test_log_rotation(tmp_path):
+    handler = RotatingBatchFileHandler(str(tmp_path / "rotate.log"), max_bytes=100, backup_count=2)
+    handler.setFormatter(logging.Formatter("%(message)s"))
+    records = [logging.makeLogRecord({"msg": "x" * 39}) for _ in range(8)]
+    for record in records:
+        handler.emit_batch([record])
+    handler.close()
+
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["rotate.log", "rotate.log.1", "rotate.log.2"]
+    assert (tmp_path / "rotate.log").read_text() == ("x" * 39 + "\n") * 2
+
+
+def test_log_processes(tmp_path):
+    script = tmp_path / "writer.py"
+    script.write_text(WRITER)
+
+    # processes sharing one log file rotate it without losing or mixing lines
+    env = dict(os.environ, PYTHONPATH=str(pathlib.Path(__file__).resolve().parent.parent))
+    writers = [subprocess.Popen([sys.executable, str(script), str(index)], cwd=str(tmp_path), env=env)
+               for index in range(3)]
+    assert [writer.wait() for writer in writers] == [0, 0, 0]
+
+    lines = read_lines(tmp_path)
+    assert len(lines) == 900
+    assert all(re.search(r" INFO - writer \d line \d+$", line) for line in lines)
+    assert len(list(tmp_path.glob("shared.log.*"))) > 2
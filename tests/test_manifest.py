@@ -0,0 +1,40 @@
+from metacli.manifest import ManifestRegistry
+import json
+import os
+import pytest
+
+
+def test_manifest_registry(tmp_path, monkeypatch):
+    registry = ManifestRegistry()
+    plugin_json = tmp_path / "plugin_commands.json"
+    plugin_json.write_text(json.dumps({"modules": [{"name": "fish"}]}))
+
+    parsed = []
+    monkeypatch.setattr("json.load", lambda f: parsed.append(f.name) or json.loads(f.read()))
+
+    # parsed once, later loads share the result
+    data = registry.load(str(plugin_json))
+    assert registry.load(str(plugin_json)) is data
+    assert parsed == [str(plugin_json)]
+
+    # changed file is parsed again
+    plugin_json.write_text(json.dumps({"modules": [{"name": "shark"}]}))
+    os.utime(str(plugin_json), ns=(0, 0))
+    assert registry.load(str(plugin_json))["modules"][0]["name"] == "shark"
+    assert len(parsed) == 2
+
+
+def test_manifest_registry_invalid(tmp_path, capsys):
+    registry = ManifestRegistry()
+    invalid_json = tmp_path / "invalid.json"
+    invalid_json.write_text('{"name": 1}')
+    not_json = tmp_path / "not.json"
+    not_json.write_text("modules")
+
+    registry.load(str(invalid_json))
+    assert capsys.readouterr().out.startswith("invalid json")
+
+    with pytest.raises(json.decoder.JSONDecodeError):
+        registry.load(str(not_json))
+    registry.check(str(not_json))
+    assert capsys.readouterr().out.count("text is not json") == 1
@@ -0,0 +1,208 @@
+from metacli.permission import PermissionManager
+import click
+import json
+import pytest
+import time
+
+
+def test_permission_views(tmp_path):
+    permission_file = tmp_path / ".temp.txt"
+    permission_file.write_text("user$" + str(time.time()))
+    manager = PermissionManager(path=str(permission_file))
+
+    @click.group()
+    def root():
+        pass
+
+    @root.command("deploy")
+    def deploy():
+        pass
+
+    @root.command("status")
+    def status():
+        pass
+
+    deploy.permission = "developer"
+
+    # user level is read once and each level has its own view
+    assert manager.get_user_level() == "user"
+    permission_file.write_text("developer$" + str(time.time()))
+    assert manager.get_user_level() == "user"
+    assert list(manager.get_view(root, "user")) == ["status"]
+    assert list(manager.get_view(root, "developer")) == ["deploy", "status"]
+
+    manager.restrict(root)
+    assert list(root.commands) == ["status"]
+    manager.unrestrict(root)
+    assert list(root.commands) == ["deploy", "status"]
+
+
+def test_permission_expired(tmp_path):
+    permission_file = tmp_path / ".temp.txt"
+    permission_file.write_text("developer$" + str(time.time() - 120))
+
+    # expired level falls back to lowest level, missing file uses default level
+    assert PermissionManager(path=str(permission_file), ttl=60).get_user_level() == "user"
+    assert PermissionManager(path=str(tmp_path / "missing")).get_user_level() == "developer"
+
+
+@pytest.mark.parametrize("lazy", [False, True])
+def test_plugin_permission(tmp_path, monkeypatch, lazy):
+    from metacli.decorators import loadPlugin
+    from metacli.permission import permissions
+    from click.testing import CliRunner
+
+    permission_file = tmp_path / ".temp.txt"
+    permission_file.write_text("user$" + str(time.time()))
+    monkeypatch.setattr(permissions, "path", str(permission_file))
+    monkeypatch.setattr(permissions, "level", None)
+    monkeypatch.setattr(permissions, "show_all", False)
+
+    # root -> mid -> fish, fish is only available for developers
+    (tmp_path / "mid").mkdir()
+    (tmp_path / "mid" / "midcli.py").write_text('''import click
+from metacli.decorators import loadPlugin
+
+
+@loadPlugin(json_file="plugin_commands.json", base_path=__file__, lazy={lazy})
+@click.group()
+def mid():
+    pass
+'''.format(lazy=lazy))
+    (tmp_path / "mid" / "fish").mkdir()
+    (tmp_path / "mid" / "fish" / "fishcli.py").write_text('''import click
+
+
+@click.group()
+def fish():
+    pass
+
+
+@fish.command("swim")
+def swim():
+    click.echo("fish is swimming")
+''')
+    (tmp_path / "mid" / "plugin_commands.json").write_text(json.dumps({"modules": [
+        {"name": "fish", "click_root": "fish", "package_path": "./fish/", "package_name": "fishcli",
+         "permission": "developer"}]}))
+    (tmp_path / "plugin_commands.json").write_text(json.dumps({"modules": [
+        {"name": "mid", "click_root": "mid", "package_path": "./mid/", "package_name": "midcli"}]}))
+
+    @loadPlugin(json_file="plugin_commands.json", base_path=str(tmp_path / "rootcli.py"))
+    @click.group()
+    def permission_root():
+        pass
+
+    # placeholders of lazy plugins carry the permission of plugin json
+    runner = CliRunner()
+    assert "fish" not in runner.invoke(permission_root, ["mid", "--help"]).output
+    assert runner.invoke(permission_root, ["mid", "fish", "swim"]).exit_code != 0
+
+    # shell shows all plugins, also those loaded after it started
+    permissions.unrestrict(permission_root)
+    result = runner.invoke(permission_root, ["mid", "fish", "swim"])
+    assert "fish is swimming" in result.output
+
+
+def test_cached_plugin_permission(tmp_path, monkeypatch):
+    from metacli.decorators import loadPlugin
+    from metacli.permission import permissions
+    from metacli.completion import CompletionIndex
+    from click.testing import CliRunner
+
+    monkeypatch.setattr(permissions, "expires", float("inf"))
+    monkeypatch.setattr(permissions, "show_all", False)
+
+    # root -> fish -> deploy, deploy is only available for developers
+    (tmp_path / "fish").mkdir()
+    (tmp_path / "fish" / "fishcli.py").write_text('''import click
+from metacli.decorators import loadPlugin
+
+
+@loadPlugin(json_file="plugin_commands.json", base_path=__file__)
+@click.group()
+def fish():
+    pass
+
+
+@fish.command("swim")
+def swim():
+    click.echo("fish is swimming")
+''')
+    (tmp_path / "fish" / "deploy").mkdir()
+    (tmp_path / "fish" / "deploy" / "deploycli.py").write_text('''import click
+
+
+@click.command()
+def deploy():
+    """deploy the fish"""
+''')
+    (tmp_path / "fish" / "plugin_commands.json").write_text(json.dumps({"modules": [
+        {"name": "deploy", "click_root": "deploy", "package_path": "./deploy/", "package_name": "deploycli",
+         "permission": "developer"}]}))
+    (tmp_path / "plugin_commands.json").write_text(json.dumps({"modules": [
+        {"name": "fish", "click_root": "fish", "package_path": "./fish/", "package_name": "fishcli"}]}))
+
+    def load_root():
+        @loadPlugin(json_file="plugin_commands.json", base_path=str(tmp_path / "rootcli.py"), cache=True)
+        @click.group()
+        def cached_permission_root():
+            pass
+        return cached_permission_root
+
+    # a developer run fills the cache
+    monkeypatch.setattr(permissions, "level", "developer")
+    assert "deploy" in CliRunner().invoke(load_root(), ["fish", "--help"]).output
+
+    # help and completion from the cache only show commands of the user level
+    monkeypatch.setattr(permissions, "level", "user")
+    root = load_root()
+    assert root.commands["fish"].resolved is None
+    assert "deploy" not in CliRunner().invoke(root, ["fish", "--help"]).output
+    assert CompletionIndex.build(root).complete(["fish", ""]) == ["swim"]
+    assert root.commands["fish"].resolved is None
+
+    monkeypatch.setattr(permissions, "level", "developer")
+    assert CompletionIndex.build(load_root()).complete(["fish", ""]) == ["deploy", "swim"]
+
+
+def test_root_plugin_permission(tmp_path, monkeypatch):
+    from metacli.decorators import loadPlugin
+    from metacli.permission import permissions
+    from click.testing import CliRunner
+
+    monkeypatch.setattr(permissions, "level", "user")
+    monkeypatch.setattr(permissions, "expires", float("inf"))
+    monkeypatch.setattr(permissions, "show_all", False)
+
+    (tmp_path / "fish").mkdir()
+    (tmp_path / "fish" / "fishcli.py").write_text('''import click
+
+
+@click.command()
+def fish():
+    click.echo("fish is swimming")
+''')
+    (tmp_path / "plugin_commands.json").write_text(json.dumps({"modules": [
+        {"name": "fish", "click_root": "fish", "package_path": "./fish/", "package_name": "fishcli",
+         "permission": "developer"}]}))
+
+    @loadPlugin(json_file="plugin_commands.json", base_path=str(tmp_path / "rootcli.py"))
+    @click.group()
+    def top_root():
+        pass
+
+    # commands added after loadPlugin are kept in every view
+    @top_root.command("status")
+    def status():
+        click.echo("ok")
+
+    # plugins of the root group are filtered for the user level
+    runner = CliRunner()
+    assert "fish" not in runner.invoke(top_root, ["--help"]).output
+    assert runner.invoke(top_root, ["fish"]).exit_code != 0
+    assert "ok" in runner.invoke(top_root, ["status"]).output
+
+    permissions.unrestrict(top_root)
+    assert list(top_root.commands) == ["fish", "status"]
+    assert "fish is swimming" in runner.invoke(top_root, ["fish"]).output
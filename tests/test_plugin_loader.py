@@ -4,6 +4,8 @@
 """Tests for `metacli` package."""
 
 import click
+import json
+import sys
 from click.testing import CliRunner
 
 # Test Dynamic Plugin
@@ -31,3 +33,322 @@ def test_plugin_loader(root):
     help_result = runner.invoke(root, ['dog', 'cat', '--help'])
     assert help_result.exit_code == 0
     assert "Welcome to cat\'s world" in help_result.output
+
+
+def write_plugin_tree(path, names=("fish",)):
+    """ create a base plugin json with one plugin cli per name in path """
+    modules = []
+    for name in names:
+        plugin_path = path / name
+        plugin_path.mkdir()
+        (plugin_path / (name + "cli.py")).write_text('''import click
+
+
+@click.group()
+def {0}():
+    """{1} can swim"""
+    pass
+
+
+@{0}.command("swim")
+def swim():
+    """{0} is swimming"""
+    click.echo("{0} is swimming")
+'''.format(name, name.capitalize()))
+        modules.append({"name": name,
+                        "click_root": name,
+                        "package_path": "./" + name + "/",
+                        "package_name": name + "cli",
+                        "help": name.capitalize() + " can swim"})
+
+    (path / "plugin_commands.json").write_text(json.dumps({"modules": modules}))
+    return str(path / "rootcli.py")
+
+
+# Test Lazy Plugin
+def test_lazy_plugin_loader(tmp_path):
+    from metacli.decorators import loadPlugin
+    from metacli.plugin import LazyPluginGroup
+
+    @loadPlugin(json_file="plugin_commands.json", base_path=write_plugin_tree(tmp_path), lazy=True)
+    @click.group()
+    def lazy_root():
+        """lazy root"""
+        pass
+
+    runner = CliRunner()
+    placeholder = lazy_root.commands["fish"]
+    assert isinstance(placeholder, LazyPluginGroup)
+
+    # help of root does not load plugin module
+    help_result = runner.invoke(lazy_root, ['--help'])
+    assert help_result.exit_code == 0
+    assert "Fish can swim" in help_result.output
+    assert placeholder.resolved is None
+
+    # invoking plugin loads module and replaces placeholder
+    result = runner.invoke(lazy_root, ['fish', 'swim'])
+    assert result.exit_code == 0
+    assert "fish is swimming" in result.output
+    assert placeholder.resolved is lazy_root.commands["fish"]
+
+
+# Test Plugin Cache
+def test_cached_plugin_loader(tmp_path):
+    from metacli.decorators import loadPlugin
+    from metacli.plugin import LazyPluginGroup
+    import os
+
+    base_path = write_plugin_tree(tmp_path)
+
+    def load_root():
+        @loadPlugin(json_file="plugin_commands.json", base_path=base_path, cache=True)
+        @click.group()
+        def cached_root():
+            """cached root"""
+            pass
+        return cached_root
+
+    # first run walks the plugins and writes the cache
+    root = load_root()
+    assert not isinstance(root.commands["fish"], LazyPluginGroup)
+    assert os.path.exists(str(tmp_path / ".metacli_cache" / "plugin_commands.json"))
+
+    # second run builds the plugin from cache without importing it
+    root = load_root()
+    placeholder = root.commands["fish"]
+    assert isinstance(placeholder, LazyPluginGroup)
+    help_result = CliRunner().invoke(root, ['--help'])
+    assert "Fish can swim" in help_result.output
+    assert placeholder.resolved is None
+
+    # changed plugin file is walked again
+    cli_path = tmp_path / "fish" / "fishcli.py"
+    cli_path.write_text(cli_path.read_text().replace("fish is swimming", "fish is diving"))
+    root = load_root()
+    assert not isinstance(root.commands["fish"], LazyPluginGroup)
+    result = CliRunner().invoke(root, ['fish', 'swim'])
+    assert "fish is diving" in result.output
+
+
+# Test Parallel Plugin Loader
+def test_parallel_plugin_loader(tmp_path):
+    from metacli.decorators import loadPlugin
+    from metacli.finder import finder
+
+    names = ("fish", "shark", "whale", "eel")
+    base_path = write_plugin_tree(tmp_path, names)
+    sys_path = list(sys.path)
+
+    @loadPlugin(json_file="plugin_commands.json", base_path=base_path, workers=4)
+    @click.group()
+    def parallel_root():
+        """parallel root"""
+        pass
+
+    # registered and added to plugin finder in manifest order
+    assert list(parallel_root.commands) == list(names)
+    assert finder.roots[-len(names):] == [str(tmp_path / name) for name in names]
+    assert sys.path == sys_path
+
+    result = CliRunner().invoke(parallel_root, ['whale', 'swim'])
+    assert "whale is swimming" in result.output
+
+
+# Test Plugin Finder
+def test_plugin_finder_import(tmp_path):
+    from metacli.finder import add_plugin_root
+    import importlib
+
+    import py_compile
+
+    (tmp_path / "finder_helper.py").write_text("VALUE = 'found'\n")
+    # sourceless bytecode module, as shipped by some plugins
+    (tmp_path / "compiled_source.py").write_text("VALUE = 'compiled'\n")
+    py_compile.compile(str(tmp_path / "compiled_source.py"), cfile=str(tmp_path / "finder_compiled.pyc"))
+    (tmp_path / "compiled_source.py").unlink()
+    sys_path = list(sys.path)
+    add_plugin_root(str(tmp_path))
+
+    assert importlib.import_module("finder_helper").VALUE == "found"
+    assert importlib.import_module("finder_compiled").VALUE == "compiled"
+    assert sys.path == sys_path
+    del sys.modules["finder_helper"]
+    del sys.modules["finder_compiled"]
+
+
+# Test Plugin Module Registry
+def test_plugin_module_registry(tmp_path):
+    from metacli.decorators import loadPlugin
+    from metacli.plugin import registry
+
+    base_path = write_plugin_tree(tmp_path, ("carp",))
+    stats = registry.stats()
+
+    def load_root():
+        @loadPlugin(json_file="plugin_commands.json", base_path=base_path)
+        @click.group()
+        def shared_root():
+            """shared root"""
+            pass
+        return shared_root
+
+    # plugin reached from two roots is executed once and shared
+    first, second = load_root(), load_root()
+    assert first.commands["carp"] is second.commands["carp"]
+    assert registry.stats()["misses"] == stats["misses"] + 1
+    assert registry.stats()["hits"] == stats["hits"] + 1
+
+
+# Test Plugin Shared Under Different Names
+def test_shared_plugin_renamed(tmp_path):
+    from metacli.decorators import loadPlugin
+
+    shared = tmp_path / "shared"
+    shared.mkdir()
+    write_plugin_tree(shared, ("x",))
+    roots = {}
+    for parent, name in (("a", "first"), ("b", "second")):
+        (tmp_path / parent).mkdir()
+        (tmp_path / parent / "plugin_commands.json").write_text(json.dumps({"modules": [
+            {"name": name, "click_root": "x", "package_path": "../shared/x/", "package_name": "xcli"}]}))
+
+        @loadPlugin(json_file="plugin_commands.json", base_path=str(tmp_path / parent / "rootcli.py"))
+        @click.group()
+        def diamond_root():
+            """diamond root"""
+            pass
+        roots[parent] = diamond_root
+
+    # the module is executed once, both parents find it under their own name
+    assert list(roots["a"].commands) == ["first"]
+    assert list(roots["b"].commands) == ["second"]
+    for parent, name in (("a", "first"), ("b", "second")):
+        result = CliRunner().invoke(roots[parent], [name, 'swim'])
+        assert "x is swimming" in result.output
+
+
+# Test Exported Plugin Root
+def test_exported_plugin_root(tmp_path, monkeypatch):
+    from metacli.decorators import loadPlugin
+
+    base_path = write_plugin_tree(tmp_path, ("trout",))
+    cli_path = tmp_path / "trout" / "troutcli.py"
+    cli_path.write_text(cli_path.read_text()
+                        .replace("import click\n", "import click\nfrom metacli.decorators import exportCommand\n")
+                        .replace("@click.group()", "@exportCommand\n@click.group()\n@click.pass_context")
+                        .replace("def trout():", "def trout(ctx):"))
+
+    # exported click_root is found without scanning module members
+    def fail_scan(*args):
+        raise AssertionError("module should not be scanned")
+    monkeypatch.setattr("inspect.getmembers", fail_scan)
+
+    @loadPlugin(json_file="plugin_commands.json", base_path=base_path)
+    @click.group()
+    def exported_root():
+        """exported root"""
+        pass
+
+    result = CliRunner().invoke(exported_root, ['trout', 'swim'])
+    assert "trout is swimming" in result.output
+
+
+# Test Entry Point Plugin
+def test_entry_point_plugin(tmp_path, monkeypatch):
+    from metacli.decorators import loadPlugin
+    from metacli.plugin import LazyPluginGroup
+    import os
+
+    site = tmp_path / "site"
+    (site / "pike_dist-1.0.dist-info").mkdir(parents=True)
+    (site / "pike_dist-1.0.dist-info" / "METADATA").write_text("Name: pike-dist\nVersion: 1.0\n")
+    (site / "pike_dist-1.0.dist-info" / "entry_points.txt").write_text("[metacli_test]\npike = pikecli:pike\n")
+    (site / "pikecli.py").write_text('''import click
+
+
+@click.group(help="Pike can swim")
+def pike():
+    pass
+
+
+@pike.command("swim")
+def swim():
+    click.echo("pike is swimming")
+''')
+    monkeypatch.syspath_prepend(str(site))
+    base = tmp_path / "base"
+    base.mkdir()
+
+    def load_root():
+        @loadPlugin(base_path=str(base / "rootcli.py"), entry_point_group="metacli_test")
+        @click.group()
+        def entry_point_root():
+            """entry point root"""
+            pass
+        return entry_point_root
+
+    # installed plugin is registered without importing it, index is cached
+    root = load_root()
+    assert isinstance(root.commands["pike"], LazyPluginGroup)
+    assert "pikecli" not in sys.modules
+    assert os.path.exists(str(base / ".metacli_cache" / "entry_points.metacli_test.json"))
+
+    result = CliRunner().invoke(root, ['pike', 'swim'])
+    assert "pike is swimming" in result.output
+
+    # second start reads the cached index instead of scanning distributions
+    monkeypatch.setattr("metacli.entry_points.scan_entry_points", lambda group: [])
+    assert "pike" in load_root().commands
+    del sys.modules["pikecli"]
+
+
+# Test Help From Plugin Cache
+def test_cached_plugin_help(tmp_path):
+    from metacli.decorators import loadPlugin
+
+    base_path = write_plugin_tree(tmp_path, ("perch",))
+    cli_path = tmp_path / "perch" / "perchcli.py"
+    cli_path.write_text(cli_path.read_text()
+                        .replace("@click.group()", '@click.group(context_settings={"help_option_names": ["-h", "--help"]})')
+                        .replace('@perch.command("swim")', '''@perch.command("swim")
+@click.option("--depth", type=int, default=3, show_default=True, help="how deep")
+@click.option("--style", type=click.Choice(["crawl", "fly"]), help="stroke")''')
+                        .replace("def swim():", "def swim(depth, style):"))
+
+    def load_root():
+        @loadPlugin(json_file="plugin_commands.json", base_path=base_path, cache=True)
+        @click.group()
+        def help_root():
+            """help root"""
+            pass
+        return help_root
+
+    runner = CliRunner()
+    expected = runner.invoke(load_root(), ['perch', 'swim', '--help']).output
+
+    # help is rendered from cache without loading the plugin
+    root = load_root()
+    placeholder = root.commands["perch"]
+    result = runner.invoke(root, ['perch', 'swim', '--help'])
+    assert result.exit_code == 0
+    assert result.output == expected
+    assert "--depth INTEGER" in result.output and "[crawl|fly]" in result.output
+
+    result = runner.invoke(root, ['perch', '--help'])
+    assert "perch is swimming" in result.output
+    # help option names of the plugin are known from cache
+    assert runner.invoke(root, ['perch', 'swim', '-h']).output == expected
+    assert placeholder.resolved is None
+
+    # --help as value of an option is passed to the plugin
+    root = load_root()
+    placeholder = root.commands["perch"]
+    result = runner.invoke(root, ['perch', 'swim', '--depth', '--help'])
+    assert result.exit_code != 0 and "Usage" in result.output and "--depth INTEGER" not in result.output
+    assert placeholder.resolved is not None
+
+    # the plugin is loaded to run a command
+    result = runner.invoke(root, ['perch', 'swim'])
+    assert "perch is swimming" in result.output
+    assert placeholder.resolved is not None
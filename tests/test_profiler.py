@@ -0,0 +1,73 @@
+from metacli.profiler import StartupProfiler, PROFILE_ENV
+import json
+import sys
+
+
+def test_startup_profiler(tmp_path, monkeypatch):
+    profile_path = tmp_path / "profile.json"
+    monkeypatch.setenv(PROFILE_ENV, str(profile_path))
+    monkeypatch.syspath_prepend(str(tmp_path))
+    (tmp_path / "profiled_dependency.py").write_text("VALUE = 1\n")
+
+    profiler = StartupProfiler()
+    profiler.configure()
+    with profiler.section("plugin", "fish"):
+        import profiled_dependency
+    profiler.finish()
+    del sys.modules["profiled_dependency"]
+
+    # third-party import is attributed to the plugin importing it
+    with open(str(profile_path)) as f:
+        profile = json.load(f)
+    plugin = profile["children"][0]
+    assert (plugin["kind"], plugin["name"]) == ("plugin", "fish")
+    assert plugin["children"][0]["name"] == "profiled_dependency"
+    assert plugin["inclusive_ms"] >= plugin["exclusive_ms"]
+
+
+def test_parallel_plugins_profiled_under_parent(tmp_path, monkeypatch):
+    from metacli.decorators import loadPlugin
+    from metacli.profiler import ProfileNode
+    from tests.test_plugin_loader import write_plugin_tree
+    import click
+
+    profiler = StartupProfiler()
+    profiler.enabled = True
+    profiler.root = ProfileNode("startup", "test")
+    monkeypatch.setattr("metacli.plugin.profiler", profiler)
+
+    # root -> mid -> (fish, shark) where mid loads its plugins in worker threads
+    mid_path = tmp_path / "mid"
+    mid_path.mkdir()
+    write_plugin_tree(mid_path, ("fish", "shark"))
+    (mid_path / "midcli.py").write_text('''import click
+from metacli.decorators import loadPlugin
+
+
+@loadPlugin(json_file="plugin_commands.json", base_path=__file__, workers=2)
+@click.group()
+def mid():
+    pass
+''')
+    (tmp_path / "plugin_commands.json").write_text(json.dumps({"modules": [
+        {"name": "mid", "click_root": "mid", "package_path": "./mid/", "package_name": "midcli"}]}))
+
+    @loadPlugin(json_file="plugin_commands.json", base_path=str(tmp_path / "rootcli.py"))
+    @click.group()
+    def profiled_root():
+        pass
+
+    def find(node, kind, name):
+        if (node.kind, node.name) == (kind, name):
+            return node
+        for child in node.children:
+            found = find(child, kind, name)
+            if found is not None:
+                return found
+        return None
+
+    plugins = [node for node in profiler.root.children if node.kind == "plugin"]
+    assert [node.name for node in plugins] == ["mid"]
+    mid = plugins[0]
+    assert find(mid, "plugin", "fish") is not None and find(mid, "plugin", "shark") is not None
+    assert mid.exclusive >= 0
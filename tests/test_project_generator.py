@@ -111,5 +111,189 @@ def test_generate_project_from_yaml(monkeypatch):
         shutil.rmtree(result_base_path)
 
 
+def test_generate_deep_cli(tmp_path):
+    from metacli.schema import ProjectGenerator
+    import jinja2
+
+    # nested deeper than the recursion limit
+    depth = 3000
+    schema = [{"name": "level0", "help": "level 0", "hidden": "False", "params": [], "commands": [], "groups": []}]
+    group = schema[0]
+    for level in range(1, depth):
+        child = {"name": "level" + str(level), "help": "level", "hidden": "False", "params": [], "commands": [],
+                 "groups": []}
+        group["commands"].append({"name": "cmd" + str(level), "help": "cmd", "hidden": "False", "params": []})
+        group["groups"].append(child)
+        group = child
+
+    generator = ProjectGenerator(str(tmp_path / "deep"), "deep")
+    env = jinja2.Environment(loader=jinja2.PackageLoader("metacli", "templates"))
+    cli_output, cli_path = generator.generate_cli_from_data(env, schema, "level0")
+    generator.write_files([cli_output], [cli_path])
+
+    with open(cli_path) as f:
+        content = f.read()
+    # a group comes before its commands, its commands before its groups
+    assert content.index("def level1(") < content.index("def cmd2(") < content.index("def level2(")
+    assert content.count("@click.pass_context") == 2 * depth - 1
+
+
+def test_update_project(monkeypatch, tmp_path):
+    import json
+
+    runner = CliRunner()
+    base = str(pathlib.Path(__file__).resolve().parent)
+    monkeypatch.setattr(metacli, "get_project_path_and_name", lambda: (str(tmp_path), "update_project_test"))
+    with open(base + "/templates/schema.json") as f:
+        schema = json.load(f)
+    schema_path = str(tmp_path / "schema.json")
+    with open(schema_path, "w") as f:
+        json.dump(schema, f)
+
+    result = runner.invoke(metacli.metacli, ["create_project", "--fromjson", schema_path])
+    assert result.exit_code == 0
+    project_path = tmp_path / "update_project_test"
+    cli_path = project_path / "update_project_testcli.py"
+    with open(cli_path) as f:
+        created = f.read()
+
+    # first update renders everything, files did not change
+    result = runner.invoke(metacli.metacli, ["update_project", "--fromjson", schema_path])
+    assert result.exit_code == 0
+    assert "wrote 0 of 4 files" in result.output
+    with open(cli_path) as f:
+        assert f.read() == created
+
+    result = runner.invoke(metacli.metacli, ["update_project", "--fromjson", schema_path])
+    assert result.output.strip() == "project is up to date"
+
+    # one changed command is rendered again, only the cli file is written
+    setup_mtime = os.stat(project_path / "setup.py").st_mtime_ns
+    schema[0]["commands"][0]["help"] = "changed help"
+    with open(schema_path, "w") as f:
+        json.dump(schema, f)
+    result = runner.invoke(metacli.metacli, ["update_project", "--fromjson", schema_path])
+    assert result.exit_code == 0
+    assert "rendered 1 commands / groups, wrote 1 of 4 files" in result.output
+    with open(cli_path) as f:
+        assert "changed help" in f.read()
+    assert os.stat(project_path / "setup.py").st_mtime_ns == setup_mtime
+
+    # a changed template renders every command / group again
+    template_dir = tmp_path / "custom_templates"
+    template_dir.mkdir()
+    with open(base + "/../metacli/templates/cli_body.txt") as f:
+        (template_dir / "cli_body.txt").write_text("# custom body\n" + f.read())
+    result = runner.invoke(metacli.metacli, ["update_project", "--fromjson", schema_path,
+                                             "--template_dir", str(template_dir)])
+    assert result.exit_code == 0
+    assert "project is up to date" not in result.output
+    with open(cli_path) as f:
+        content = f.read()
+    assert content.count("# custom body") == content.count("@click.pass_context") > 0
+    result = runner.invoke(metacli.metacli, ["update_project", "--fromjson", schema_path,
+                                             "--template_dir", str(template_dir)])
+    assert result.output.strip() == "project is up to date"
+
+
+def test_batch_create_projects(tmp_path):
+    import json
+
+    base = str(pathlib.Path(__file__).resolve().parent)
+    schemas = tmp_path / "schemas"
+    schemas.mkdir()
+    shutil.copy(base + "/templates/schema.json", str(schemas / "first.json"))
+    shutil.copy(base + "/templates/schema.yaml", str(schemas / "second.yaml"))
+    with open(str(schemas / "broken.json"), "w") as f:
+        f.write("[{\"name\": \"broken\"}]")
+    output = tmp_path / "projects"
+
+    runner = CliRunner()
+    result = runner.invoke(metacli.metacli, ["batch_create_projects", str(schemas), "--output", str(output),
+                                             "--workers", "2"])
+    assert result.exit_code == 1
+    records = {os.path.basename(record["schema"]): record for record in map(json.loads, result.output.splitlines())}
+    assert records["first.json"]["status"] == "ok"
+    assert records["second.yaml"]["status"] == "ok"
+    assert records["broken.json"]["status"] == "error"
+    assert (output / "first" / "firstcli.py").exists()
+    assert (output / "second" / "secondcli.py").exists()
+    assert not (output / "broken").exists()
+
+    # existing projects are kept without --overwrite
+    result = runner.invoke(metacli.metacli, ["batch_create_projects", str(schemas / "*.yaml"), "--output",
+                                             str(output)])
+    assert json.loads(result.output)["error"] == "project already exists"
+    result = runner.invoke(metacli.metacli, ["batch_create_projects", str(schemas / "*.yaml"), "--output",
+                                             str(output), "--overwrite"])
+    assert result.exit_code == 0
+    assert json.loads(result.output)["status"] == "ok"
+
+
+def test_write_files_atomic(tmp_path):
+    from metacli.schema import ProjectGenerator
+
+    project_path = str(tmp_path / "atomic")
+    generator = ProjectGenerator(project_path, "atomic")
+    generator.write_files(["first"], [project_path + "/setup.py"])
+
+    def failing_output():
+        yield "partial"
+        raise OSError("disk full")
+
+    # a failed write keeps the existing project as it was
+    generator = ProjectGenerator(project_path, "atomic", overwrite=True)
+    with pytest.raises(OSError):
+        generator.write_files(["second", failing_output()], [project_path + "/setup.py", project_path + "/cli.py"],
+                              strict=True)
+    assert os.listdir(str(tmp_path)) == ["atomic"]
+    assert os.listdir(project_path) == ["setup.py"]
+    with open(project_path + "/setup.py") as f:
+        assert f.read() == "first"
+
+    generator.write_files(["second", "cli"], [project_path + "/setup.py", project_path + "/sub/cli.py"], fsync=True)
+    assert os.listdir(str(tmp_path)) == ["atomic"]
+    with open(project_path + "/setup.py") as f:
+        assert f.read() == "second"
+    with open(project_path + "/sub/cli.py") as f:
+        assert f.read() == "cli"
+
+
+def test_template_env(monkeypatch, tmp_path):
+    from metacli import schema
+
+    cache_dir = tmp_path / "cache"
+    monkeypatch.setenv(schema.TEMPLATE_CACHE_ENV, str(cache_dir))
+    monkeypatch.setenv("HOME", str(tmp_path / "home"))
+    monkeypatch.setattr(schema, "_template_envs", {})
+    user_dir = tmp_path / "user_templates"
+    user_dir.mkdir()
+    with open(str(user_dir / "setup.txt"), "w") as f:
+        f.write("# custom setup of {{ name }}")
+
+    names = schema.precompile_templates([str(user_dir)])
+    assert "setup.txt" in names and "cli_body.txt" in names
+    # one compiled file per template
+    assert len(os.listdir(str(cache_dir))) == len(names)
+
+    env = schema.get_template_env([str(user_dir)])
+    assert env is schema.get_template_env((str(user_dir),))
+    assert env.get_template("setup.txt").render(name="demo") == "# custom setup of demo"
+    assert "custom" not in schema.get_template_env().get_template("setup.txt").render(name="demo")
+    # nothing is compiled into the default cache in the home folder
+    assert not (tmp_path / "home").exists()
+
+
+def test_template_cache_dir(monkeypatch, tmp_path):
+    from metacli import schema
+
+    monkeypatch.setenv("HOME", str(tmp_path))
+    monkeypatch.delenv(schema.TEMPLATE_CACHE_ENV, raising=False)
+    assert schema.get_template_cache_dir() == str(tmp_path / ".metacli_cache" / "templates")
+
+    monkeypatch.setenv(schema.TEMPLATE_CACHE_ENV, str(tmp_path / "cache"))
+    assert schema.get_template_cache_dir() == str(tmp_path / "cache")
+
+
 if __name__ == '__main__':
     pytest.main()
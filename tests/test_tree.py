@@ -0,0 +1,58 @@
+from click.testing import CliRunner
+from metacli.builtin_plugins import tree
+from metacli.util import render_tree
+import click
+import io
+
+
+def make_layout(path):
+    (path / "fish" / "fins").mkdir(parents=True)
+    (path / "fish" / "fins" / "left.py").write_text("")
+    (path / "fish" / "fishcli.py").write_text("")
+    (path / ".git" / "objects").mkdir(parents=True)
+    for index in range(5):
+        (path / "file{}.txt".format(index)).write_text("")
+
+
+def test_render_tree(tmp_path):
+    make_layout(tmp_path)
+    out = io.StringIO()
+    render_tree(str(tmp_path), out, max_entries=3)
+
+    assert out.getvalue().splitlines() == [tmp_path.name + "/",
+                                           "    file0.txt", "    file1.txt", "    file2.txt", "    ... 3 more"]
+
+    out = io.StringIO()
+    render_tree(str(tmp_path / "fish"), out, max_depth=1)
+    assert out.getvalue().splitlines() == ["fish/", "    fishcli.py", "    fins/"]
+
+    out = io.StringIO()
+    render_tree(str(tmp_path), out, ignore=("file*",))
+    assert out.getvalue().splitlines() == [tmp_path.name + "/", "    .git/", "        objects/",
+                                           "    fish/", "        fishcli.py", "        fins/", "            left.py"]
+
+
+def test_builtin_tree(tmp_path):
+    make_layout(tmp_path)
+
+    @click.group()
+    def sea():
+        pass
+
+    sea.add_command(tree)
+    result = CliRunner().invoke(sea, ["tree", str(tmp_path), "--ignore", "*.txt"])
+    assert result.output.splitlines() == [tmp_path.name + "/", "    fish/", "        fishcli.py",
+                                          "        fins/", "            left.py"]
+
+    # default is the folder of the root command
+    result = CliRunner().invoke(sea, ["tree", "--depth", "0"])
+    assert result.output == "tests/\n"
+
+    @click.group()
+    @click.pass_context
+    def reef(ctx):
+        pass
+
+    reef.add_command(tree)
+    result = CliRunner().invoke(reef, ["tree", "--depth", "0"])
+    assert result.output == "tests/\n"